@@ -11,10 +11,13 @@ from game_constants import DIRS_PREFIX, PLAYER_NAMES_FILE, LLM_LOG_FILE_FORMAT,
     SURVEY_COMMENTS_TITLE, METRIC_NAME_AND_SCORE_DELIMITER, MAFIA_WINS_MESSAGE, WHO_WINS_FILE, \
     GAME_CONFIG_FILE, PLAYERS_KEY_IN_CONFIG, CUTTING_TO_VOTE_MESSAGE, VOTING_MESSAGE_FORMAT, \
     VOTED_OUT_MESSAGE_FORMAT, VOTING_TIME_MESSAGE_FORMAT, DAYTIME_START_PREFIX, DAYTIME, \
+    MISSING_VOTES_MESSAGE_FORMAT, NO_VOTES_MESSAGE_FORMAT, NO_VALID_VOTES_MESSAGE_FORMAT, \
     NIGHTTIME_START_PREFIX, NIGHTTIME, PUBLIC_MANAGER_CHAT_FILE, PUBLIC_DAYTIME_CHAT_FILE, \
     PUBLIC_NIGHTTIME_CHAT_FILE, MAFIA_NAMES_FILE, DAYTIME_MINUTES_KEY, NIGHTTIME_MINUTES_KEY, \
-    MAFIA_ROLE, BYSTANDER_ROLE, REAL_NAMES_FILE, REAL_NAME_CODENAME_DELIMITER, strip_special_chars
+    MAFIA_ROLE, BYSTANDER_ROLE, REAL_NAMES_FILE, REAL_NAME_CODENAME_DELIMITER, strip_special_chars, \
+    merge_message_streams, GAME_EVENTS_FILE, EVENT_TYPE_KEY, CHAT_EVENT
 from game_status_checks import is_voted_out, all_players_joined
+from game_events import read_game_events
 from llm_players.llm_constants import LLM_CONFIG_KEY
 
 
@@ -32,10 +35,15 @@ CUT_TO_VOTE = "There is only one mafia member left"
 PHASE_END = "PHASE has ended, now it's time to vote"
 WHO_VOTE_FOR = "X voted for Y"
 WAS_VOTED_OUT = "X was voted out"
+MISSING_VOTES = "Voting has closed without the votes of X"
+NO_VOTES = "Nobody has voted, so X was chosen randomly"
 # manager messages signals
 VOTING_MESSAGE_SIGNAL = VOTING_MESSAGE_FORMAT.replace("{}", "")
 VOTED_OUT_SIGNAL = VOTED_OUT_MESSAGE_FORMAT.replace("{}", "")
 PHASE_END_SIGNAL = VOTING_TIME_MESSAGE_FORMAT.replace("{}", "")
+MISSING_VOTES_SIGNAL = MISSING_VOTES_MESSAGE_FORMAT.replace("{}", "")
+NO_VOTES_PREFIX, NO_VOTES_SUFFIX = NO_VOTES_MESSAGE_FORMAT.split("{}")
+NO_VALID_VOTES_PREFIX, NO_VALID_VOTES_SUFFIX = NO_VALID_VOTES_MESSAGE_FORMAT.split("{}")
 
 # message content empiric metrics
 LENGTH, REPETITION, NUM_UNIQUE_WORDS = "length", "repetition", "num_unique_words"
@@ -65,8 +73,12 @@ class ParsedMessage:
 
     def __init__(self, message, llm_player_name=None):
         self.original = message
-        hrs, mins, secs, name, content = re.match(MESSAGE_PARSING_PATTERN, message).groups()
+        hrs, mins, secs, millisecs, seq, name, content = \
+            re.match(MESSAGE_PARSING_PATTERN, message).groups()
         self.timestamp = 3600 * int(hrs) + 60 * int(mins) + int(secs)  # in seconds
+        if millisecs is not None:
+            self.timestamp += int(millisecs) / 1000
+        self.seq = int(seq) if seq is not None else None
         self.name = name
         self.is_manager = name == GAME_MANAGER_NAME
         self.is_llm = name == llm_player_name
@@ -90,6 +102,14 @@ class ParsedMessage:
             return WHO_VOTE_FOR, self.content.split(VOTING_MESSAGE_SIGNAL)  # [voter, voted for]
         elif VOTED_OUT_SIGNAL in self.content:
             return WAS_VOTED_OUT, self.content.split(VOTED_OUT_SIGNAL)[0]
+        elif self.content.startswith(MISSING_VOTES_SIGNAL):
+            return MISSING_VOTES, self.content.removeprefix(MISSING_VOTES_SIGNAL).split(", ")
+        elif self.content.startswith(NO_VOTES_PREFIX) and self.content.endswith(NO_VOTES_SUFFIX):
+            return NO_VOTES, self.content.removeprefix(NO_VOTES_PREFIX).removesuffix(NO_VOTES_SUFFIX)
+        elif self.content.startswith(NO_VALID_VOTES_PREFIX) and \
+                self.content.endswith(NO_VALID_VOTES_SUFFIX):  # also chosen randomly
+            return NO_VOTES, self.content.removeprefix(NO_VALID_VOTES_PREFIX).removesuffix(
+                NO_VALID_VOTES_SUFFIX)
         else:
             return NotImplementedError("This manager message type is new!")
 
@@ -204,7 +224,7 @@ def decide_message_order(message: ParsedMessage):
     """
     if not message.is_manager:
         return 7
-    if message.manager_message_type == WHO_VOTE_FOR:
+    if message.manager_message_type in (WHO_VOTE_FOR, MISSING_VOTES, NO_VOTES):
         return 1
     if message.manager_message_type == WAS_VOTED_OUT:
         return 2
@@ -223,15 +243,27 @@ def decide_message_order(message: ParsedMessage):
     assert False, "An edge case was forgotten!"
 
 
+def parse_messages_from_events(game_dir, all_players, mafia_players, llm_player_name):
+    # events are already in the order they happened, so no sorting heuristics are needed
+    parsed_messages = [ParsedMessage(event["line"], llm_player_name)
+                       for event in read_game_events(game_dir)
+                       if event[EVENT_TYPE_KEY] == CHAT_EVENT]
+    return parse_messages_by_phase(parsed_messages, all_players, mafia_players)
+
+
 def parse_messages(game_dir, all_players, mafia_players, llm_player_name):
+    if (game_dir / GAME_EVENTS_FILE).exists():  # games from before it existed are parsed from chats
+        return parse_messages_from_events(game_dir, all_players, mafia_players, llm_player_name)
     manager_messages = (game_dir / PUBLIC_MANAGER_CHAT_FILE).read_text().splitlines()
     daytime_messages = (game_dir / PUBLIC_DAYTIME_CHAT_FILE).read_text().splitlines()
     nighttime_messages = (game_dir / PUBLIC_NIGHTTIME_CHAT_FILE).read_text().splitlines()
-    all_messages = manager_messages + daytime_messages + nighttime_messages
-    # in some games there was a bug that multiplied messages: (still unique by timestamp and name)
-    all_messages = set(all_messages)
+    all_messages = list(merge_message_streams(manager_messages, daytime_messages,
+                                              nighttime_messages))
     parsed_messages = [ParsedMessage(message, llm_player_name) for message in all_messages]
-    parsed_messages.sort(key=lambda x: (x.timestamp, decide_message_order(x)))
+    if any(message.seq is None for message in parsed_messages):  # from before sequence numbers
+        # in some games there was a bug that multiplied messages: (still unique by timestamp and name)
+        parsed_messages = [ParsedMessage(message, llm_player_name) for message in set(all_messages)]
+        parsed_messages.sort(key=lambda x: (x.timestamp, decide_message_order(x)))
     parsed_messages_by_phase = parse_messages_by_phase(parsed_messages, all_players, mafia_players)
     return parsed_messages_by_phase
 
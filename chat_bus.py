@@ -0,0 +1,189 @@
+import struct
+from pathlib import Path
+from multiprocessing import shared_memory, resource_tracker
+from game_constants import CHAT_BUS_NAME_FORMAT, CHAT_BUS_NUM_SLOTS, CHAT_BUS_SLOT_SIZE, \
+    PUBLIC_MANAGER_CHAT_FILE, PUBLIC_DAYTIME_CHAT_FILE, PUBLIC_NIGHTTIME_CHAT_FILE, \
+    merge_message_streams, get_message_order_key
+
+CHAT_BUS_STREAMS = [PUBLIC_MANAGER_CHAT_FILE, PUBLIC_DAYTIME_CHAT_FILE, PUBLIC_NIGHTTIME_CHAT_FILE]
+# next sequence number to publish, number of slots, slot size, whether the writer has closed
+BUS_HEADER = struct.Struct("QIIB")
+# sequence number, stream index, offset of the line in its file, length of the line (in bytes)
+# and whether the line itself follows (lines that don't fit in a slot are read from the file)
+SLOT_HEADER = struct.Struct("QBQIB")
+_written_bus_names = set()  # of the buses this process writes, e.g. a web server embedding the engine
+
+
+def get_chat_bus_name(game_dir):
+    return CHAT_BUS_NAME_FORMAT.format(Path(game_dir).resolve().name)
+
+
+def _attach_shared_memory(name):
+    shm = shared_memory.SharedMemory(name)
+    # otherwise the resource tracker of a reader process destroys the bus when the reader exits,
+    # but a bus this process writes stays tracked, until the writer unlinks it
+    if name not in _written_bus_names:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class ChatBusWriter:
+    """
+    Publishes the lines that the game manager writes to the public chat files into a ring buffer
+    in shared memory, so local readers get them without any file syscalls. The chat files remain
+    the durable record: every entry carries the offset of its line in its file, so a reader that
+    fell behind by more than the ring size catches up from the files instead.
+    A game manager that restarts after a crash reopens the bus and continues its sequence numbers,
+    so readers that are already attached keep receiving the new lines.
+    """
+
+    def __init__(self, game_dir, num_slots=CHAT_BUS_NUM_SLOTS, slot_size=CHAT_BUS_SLOT_SIZE):
+        self.game_dir = Path(game_dir)
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        name = get_chat_bus_name(game_dir)
+        size = BUS_HEADER.size + num_slots * slot_size
+        self.next_seq = 0
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:  # left by a game manager that crashed
+            self._shm = shared_memory.SharedMemory(name)
+            next_seq, stale_num_slots, stale_slot_size, _ = BUS_HEADER.unpack_from(self._shm.buf, 0)
+            if (stale_num_slots, stale_slot_size) == (num_slots, slot_size):
+                self.next_seq = next_seq
+            else:  # its readers read the files once it's closed
+                self._write_header(is_closed=True)
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _written_bus_names.add(name)
+        self._file_offsets = {}  # stream -> offset in its file where the next line will be
+        self._write_header(is_closed=False)
+
+    def _write_header(self, is_closed):
+        BUS_HEADER.pack_into(self._shm.buf, 0, self.next_seq, self.num_slots, self.slot_size,
+                             is_closed)
+
+    def publish(self, stream, line):
+        stream_index = CHAT_BUS_STREAMS.index(stream)
+        if stream not in self._file_offsets:
+            path = self.game_dir / stream
+            self._file_offsets[stream] = path.stat().st_size if path.exists() else 0
+        data = line.encode()
+        fits_in_slot = SLOT_HEADER.size + len(data) <= self.slot_size
+        slot_offset = BUS_HEADER.size + (self.next_seq % self.num_slots) * self.slot_size
+        # first marks the slot with its new sequence number, so a reader in the middle of reading
+        # its previous entry notices it was overwritten
+        struct.pack_into("Q", self._shm.buf, slot_offset, self.next_seq)
+        if fits_in_slot:
+            payload_offset = slot_offset + SLOT_HEADER.size
+            self._shm.buf[payload_offset:payload_offset + len(data)] = data
+        SLOT_HEADER.pack_into(self._shm.buf, slot_offset, self.next_seq, stream_index,
+                              self._file_offsets[stream], len(data), fits_in_slot)
+        self._file_offsets[stream] += len(data)
+        self.next_seq += 1
+        self._write_header(is_closed=False)  # the entry becomes visible to readers only now
+
+    def close(self):
+        if self._shm is not None:
+            self._write_header(is_closed=True)
+            self._shm.close()
+            self._shm.unlink()
+            _written_bus_names.discard(self._shm.name)
+            self._shm = None
+
+
+class ChatBusReader:
+    """
+    Reads the lines published to a game's chat bus, only from the given streams (chat files).
+    `attach` returns None when the game manager doesn't publish a bus (or this process can't
+    access it, e.g. since it runs as another user), and then the files should be read instead.
+    A reader that already read the start of the files passes the offsets it got to in them.
+    Once the bus is closed, the lines that follow are read from the files.
+    """
+
+    def __init__(self, game_dir, shm, streams, file_offsets=None):
+        self.game_dir = Path(game_dir)
+        self._shm = shm
+        self.streams = set(streams)
+        self.next_seq = 0
+        self._file_offsets = {stream: 0 for stream in CHAT_BUS_STREAMS}  # of the next unread line
+        self._file_offsets.update(file_offsets or {})
+
+    @classmethod
+    def attach(cls, game_dir, streams=CHAT_BUS_STREAMS, file_offsets=None):
+        try:
+            shm = _attach_shared_memory(get_chat_bus_name(game_dir))
+        except OSError:  # no bus, or no permission to open it
+            return None
+        return cls(game_dir, shm, streams, file_offsets)
+
+    @property
+    def is_closed(self):
+        return bool(BUS_HEADER.unpack_from(self._shm.buf, 0)[3])
+
+    def _read_from_file(self, stream, start, length):
+        with open(self.game_dir / stream, "rb") as f:
+            f.seek(start)
+            data = f.read(length)
+        return data.decode() if len(data) == length else None  # None if not committed yet
+
+    def _catch_up_from_files(self):
+        lines_by_stream = []
+        for stream, offset in self._file_offsets.items():
+            path = self.game_dir / stream
+            if not path.exists():
+                continue
+            data = path.read_bytes()[offset:]
+            data = data[:data.rfind(b"\n") + 1]  # a partial last line is read when completed
+            self._file_offsets[stream] += len(data)
+            if stream in self.streams:
+                lines_by_stream.append([(stream, line + "\n")
+                                        for line in data.decode().splitlines()])
+        return list(merge_message_streams(
+            *lines_by_stream, key=lambda stream_and_line: get_message_order_key(stream_and_line[1])))
+
+    def read_new_lines(self):
+        """Returns the new (stream, line) pairs, each line including its line break"""
+        head, num_slots, slot_size, is_closed = BUS_HEADER.unpack_from(self._shm.buf, 0)
+        if is_closed:  # the files have every line the bus had, so nothing is skipped
+            return self._catch_up_from_files()
+        lines = []
+        if head - self.next_seq > num_slots:  # the entries we didn't read yet were overwritten
+            lines = self._catch_up_from_files()
+            self.next_seq = head - num_slots
+        while self.next_seq < head:
+            slot_offset = BUS_HEADER.size + (self.next_seq % num_slots) * slot_size
+            seq, stream_index, start, length, has_payload = \
+                SLOT_HEADER.unpack_from(self._shm.buf, slot_offset)
+            payload_offset = slot_offset + SLOT_HEADER.size
+            payload = bytes(self._shm.buf[payload_offset:payload_offset + length]) \
+                if has_payload else None
+            if SLOT_HEADER.unpack_from(self._shm.buf, slot_offset)[0] != self.next_seq or \
+                    seq != self.next_seq:
+                lines.extend(self._catch_up_from_files())  # overwritten while reading it
+                self.next_seq = max(self.next_seq + 1,
+                                    BUS_HEADER.unpack_from(self._shm.buf, 0)[0] - num_slots)
+                continue
+            stream = CHAT_BUS_STREAMS[stream_index]
+            if start >= self._file_offsets[stream]:  # not already read from the file
+                if stream in self.streams:
+                    line = payload.decode() if has_payload else \
+                        self._read_from_file(stream, start, length)
+                    if line is None:
+                        break  # try again in the next call
+                    lines.append((stream, line))
+                self._file_offsets[stream] = start + length
+            self.next_seq += 1
+        return lines
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
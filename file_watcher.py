@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import asyncio
+import select
+import struct
+import ctypes
+import ctypes.util
+from game_constants import STAT_POLLING_INTERVAL_SECONDS
+
+# inotify flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCHED_EVENTS_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len (followed by the name)
+INOTIFY_READ_SIZE = 64 * 1024
+
+
+def _load_libc_with_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc_with_inotify()
+
+
+def get_file_signature(path):
+    # a change in any of these means the file was written to, truncated or replaced
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class FileChangeWaiter:
+    """
+    Blocks until one of the given files inside a game dir changes, instead of re-reading them in
+    a busy loop. Uses inotify on the directory when available (so files that are replaced by
+    rename are also noticed), and falls back to comparing stat signatures every
+    STAT_POLLING_INTERVAL_SECONDS otherwise.
+    Changes that happen after the waiter was created and before `wait` is called are not lost.
+    """
+
+    def __init__(self, game_dir, file_names, use_inotify=True):
+        self.game_dir = game_dir
+        self.file_names = {str(file_name) for file_name in file_names}
+        self._inotify_fd = self._init_inotify() if use_inotify else None
+        self._signatures = self._get_signatures()
+
+    def _init_inotify(self):
+        if _libc is None:
+            return None
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if _libc.inotify_add_watch(fd, os.fsencode(self.game_dir), WATCHED_EVENTS_MASK) < 0:
+            os.close(fd)  # e.g. reached max_user_watches, polling still works
+            return None
+        return fd
+
+    @property
+    def uses_inotify(self):
+        return self._inotify_fd is not None
+
+    def fileno(self):
+        return self._inotify_fd
+
+    def _get_signatures(self):
+        if self.uses_inotify:
+            return None  # not needed, the kernel tracks the changes for us
+        return {file_name: get_file_signature(self.game_dir / file_name)
+                for file_name in self.file_names}
+
+    def drain_changes(self):
+        """Returns the set of watched file names that changed since the last call (non-blocking)"""
+        if not self.uses_inotify:
+            new_signatures = self._get_signatures()
+            changed = {file_name for file_name, signature in new_signatures.items()
+                       if self._signatures.get(file_name) != signature}
+            self._signatures = new_signatures
+            return changed
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._inotify_fd, INOTIFY_READ_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, name_length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+                offset += INOTIFY_EVENT_HEADER.size
+                name = data[offset:offset + name_length].rstrip(b"\0").decode()
+                offset += name_length
+                if name in self.file_names:
+                    changed.add(name)
+
+    def wait(self, timeout=None):
+        """
+        Blocks until a watched file changes or until `timeout` seconds passed (None is forever).
+        Returns the set of changed file names, which is empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if self.uses_inotify:
+                poller = select.poll()
+                poller.register(self._inotify_fd, select.POLLIN)
+                poller.poll(None if remaining is None else remaining * 1000)
+            elif remaining is None:
+                time.sleep(STAT_POLLING_INTERVAL_SECONDS)
+            else:
+                time.sleep(min(STAT_POLLING_INTERVAL_SECONDS, remaining))
+            changed = self.drain_changes()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    async def wait_async(self, timeout=None):
+        """Same as `wait`, but lets the event loop run other tasks (e.g. other games) meanwhile"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - loop.time(), 0)
+            if self.uses_inotify:
+                readable = loop.create_future()
+                loop.add_reader(self._inotify_fd,
+                                lambda: readable.done() or readable.set_result(None))
+                try:
+                    await asyncio.wait_for(readable, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    loop.remove_reader(self._inotify_fd)
+            elif remaining is None:
+                await asyncio.sleep(STAT_POLLING_INTERVAL_SECONDS)
+            else:
+                await asyncio.sleep(min(STAT_POLLING_INTERVAL_SECONDS, remaining))
+            changed = self.drain_changes()
+            if changed or (deadline is not None and loop.time() >= deadline):
+                return changed
+
+    def close(self):
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+async def wait_for_changes_or_event(waiter, event, timeout=None):
+    """
+    Waits like `waiter.wait_async`, but also returns as soon as `event` is set (and clears it), for
+    changes that are announced in memory rather than in the files. A waiter without files isn't
+    waited for. Returns whether anything changed.
+    """
+    if not event.is_set():
+        waits = [asyncio.ensure_future(event.wait())]
+        if waiter.file_names:
+            waits.append(asyncio.ensure_future(waiter.wait_async(timeout)))
+        done, pending = await asyncio.wait(waits, timeout=timeout,
+                                           return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()  # changes that it didn't return yet are returned by the next wait
+        # before returning, since the caller may close the waiter right after
+        await asyncio.gather(*pending, return_exceptions=True)
+        if not event.is_set():
+            return any(task.result() for task in done)
+    event.clear()
+    return True
@@ -0,0 +1,25 @@
+import time
+from game_constants import CLOCK_SPEEDUP_KEY, DEFAULT_CLOCK_SPEEDUP
+
+
+class GameClock:
+    """
+    The time as the game experiences it. With a speedup of N, every game duration (phases,
+    voting, and the artificial writing and voting delays of bots) passes N times faster in real
+    time, so bot-only games can be simulated quickly. A speedup of 1 is the real wall clock.
+    """
+
+    def __init__(self, speedup=DEFAULT_CLOCK_SPEEDUP):
+        if speedup <= 0:
+            raise ValueError(f"Clock speedup must be positive, got {speedup}")
+        self.speedup = speedup
+
+    def to_real_seconds(self, game_seconds):
+        return None if game_seconds is None else game_seconds / self.speedup
+
+    def sleep(self, game_seconds):
+        time.sleep(self.to_real_seconds(game_seconds))
+
+
+def get_game_clock(config):
+    return GameClock(config.get(CLOCK_SPEEDUP_KEY, DEFAULT_CLOCK_SPEEDUP))
@@ -1,4 +1,5 @@
 import re
+import heapq
 import argparse
 import random
 import time
@@ -32,6 +33,14 @@ PERSONAL_CHAT_FILE_FORMAT = "{}_chat.txt"
 PERSONAL_VOTE_FILE_FORMAT = "{}_vote.txt"
 PERSONAL_SURVEY_FILE_FORMAT = "{}_survey.txt"
 LLM_LOG_FILE_FORMAT = "{}_log.txt"
+# file that host replaces as a whole on every change, with the status of all the files above
+GAME_STATUS_FILE = "game_status.json"
+# file that only the host reads and writes, the status files above are derived from it
+GAME_JOURNAL_FILE = "game_journal.jsonl"
+# file that host writes every game event to, for analysis and replay
+GAME_EVENTS_FILE = "game_events.jsonl"
+# file that the host holds a lock on while it runs the game, so no other host runs it concurrently
+GAME_MANAGER_LOCK_FILE = "game_manager.lock"
 
 # constant strings for info files
 NIGHTTIME = "Nighttime"
@@ -59,9 +68,17 @@ RULES_OF_THE_GAME = "In this game each player is secretly assigned a role, eithe
 # formats for saving texts
 TIME_FORMAT_FOR_TIMESTAMP = "%H:%M:%S"
 MESSAGE_FORMAT = "[{timestamp}] {name}: {message}"
-MESSAGE_PARSING_PATTERN = r"\[(\d\d):(\d\d):(\d\d)\] ([^:]+): (.+)"  # depends on MESSAGE_FORMAT
+# version 2 of the format, which can be ordered across files: "[13:59:39.072 #215] Adrian: hi"
+SEQUENCED_MESSAGE_FORMAT = "[{timestamp}.{milliseconds:03d} #{seq}] {name}: {message}"
+# matches both versions, depends on MESSAGE_FORMAT and SEQUENCED_MESSAGE_FORMAT
+MESSAGE_PARSING_PATTERN = r"\[(?P<hours>\d\d):(?P<minutes>\d\d):(?P<seconds>\d\d)" \
+                          r"(?:\.(?P<milliseconds>\d\d\d) #(?P<seq>\d+))?\] " \
+                          r"(?P<name>[^:]+): (?P<content>.+)"
 VOTING_MESSAGE_FORMAT = "{} voted for {}"
 VOTED_OUT_MESSAGE_FORMAT = "{} was voted out. Their role was {}"
+MISSING_VOTES_MESSAGE_FORMAT = "Voting has closed without the votes of: {}"
+NO_VOTES_MESSAGE_FORMAT = "Nobody has voted, so {} was chosen randomly"
+NO_VALID_VOTES_MESSAGE_FORMAT = "Nobody has voted for a valid candidate, so {} was chosen randomly"
 REAL_NAME_CODENAME_DELIMITER = ": "  # <real name>: <codename>
 
 # game constants
@@ -98,6 +115,81 @@ DEFAULT_NIGHTTIME_MINUTES = 0.75  # 1  # like in Ibraheem et al. 2022
 DEFAULT_DAYTIME_MINUTES = 2  # 2.5  # 3  # it was 2:30 in Ibraheem et al. 2022
 DAYTIME_MINUTES_KEY = "daytime_minutes"
 NIGHTTIME_MINUTES_KEY = "nighttime_minutes"
+DEFAULT_VOTING_MINUTES = None  # waits for all votes, like games configured before it existed
+# players who haven't voted by then are treated as not voting, and if nobody voted then a random
+# candidate is voted out (null in config means waiting for all votes)
+VOTING_MINUTES_KEY = "voting_minutes"
+DEFAULT_STOP_VOTING_EARLY = False
+STOP_VOTING_EARLY_KEY = "stop_voting_early"  # stop when remaining votes can't change the outcome
+DEFAULT_MESSAGE_FORMAT_VERSION = 1
+MESSAGE_FORMAT_VERSION_KEY = "message_format_version"  # 2 adds sequence numbers and milliseconds
+DEFAULT_CLOCK_SPEEDUP = 1
+CLOCK_SPEEDUP_KEY = "clock_speedup"  # e.g. 10 runs bot-only games 10 times faster than real time
+DEFAULT_USE_CHAT_BUS = False
+USE_CHAT_BUS_KEY = "use_chat_bus"  # whether public messages are also published in shared memory
+DEFAULT_JOIN_TIMEOUT_MINUTES = None  # by default the game manager waits for players forever
+JOIN_TIMEOUT_MINUTES_KEY = "join_timeout_minutes"
+
+# waiting for game files to change
+STAT_POLLING_INTERVAL_SECONDS = 0.1  # only used where inotify isn't available
+GAMES_SCAN_INTERVAL_SECONDS = 5  # how often the orchestrator looks for new games to run
+# how long the games that the orchestrator finds wait for their players, unless their config says
+DEFAULT_WATCHED_GAMES_JOIN_TIMEOUT_MINUTES = 60
+MISSING_PLAYERS_REPORT_INTERVAL_SECONDS = 60  # while the game manager waits for players to join
+STATUS_CHECK_INTERVAL_SECONDS = 1  # status is checked at least that often even without changes
+# a predicate that is waited for is re-checked with exponential backoff between these intervals
+WAIT_UNTIL_MIN_RECHECK_SECONDS = 0.05
+WAIT_UNTIL_MAX_RECHECK_SECONDS = 2
+
+# writing to game files
+GROUP_COMMIT_WINDOW_SECONDS = 0.005  # appends arriving within this window are written together
+FSYNC_ON_COMMIT = False  # whether every commit also waits for the data to reach the disk
+
+# web interface
+CHAT_HISTORY_PAGE_SIZE = 250  # messages per frame when sending the history to a connecting player
+CHAT_HISTORY_FRAMES_CACHE_SIZE = 16  # sets of history frames kept per game, for players that connect together
+SEND_QUEUE_MAX_MESSAGES = 1000  # messages waiting to be sent to a player before they are too slow
+STORAGE_MAX_THREADS = 8  # threads that do the file work of the web server, for all of its games
+# when the web server runs several workers, they share the players' sessions and votes in this database
+WEB_SESSION_STORE_ENV_VAR = "MAFIA_WEB_SESSION_STORE"
+DEFAULT_WEB_SESSION_STORE_FILE = "web_sessions.sqlite3"
+SQLITE_BUSY_TIMEOUT_SECONDS = 5
+SESSION_STORE_MAX_THREADS = 4  # threads that query the shared database, off the web server's event loop
+
+# shared memory chat bus, for readers on the same machine as the game manager
+CHAT_BUS_NAME_FORMAT = "mafia_chat_bus_{}"  # of the game ID
+CHAT_BUS_NUM_SLOTS = 4096  # readers that fall behind by more than that read from the files
+CHAT_BUS_SLOT_SIZE = 512  # in bytes, longer messages are read from the files
+
+# transitions of the game state, as recorded in the game journal
+TRANSITION_TYPE_KEY = "type"
+GAME_STARTED_TRANSITION = "game_started"
+PHASE_CHANGED_TRANSITION = "phase_changed"
+PLAYER_ELIMINATED_TRANSITION = "player_eliminated"
+GAME_WON_TRANSITION = "game_won"
+GAME_CANCELLED_TRANSITION = "game_cancelled"  # not all players joined in time
+VOTE_CAST_TRANSITION = "vote_cast"  # so a restarted game manager still has the votes of the voting
+
+# keys of the game status file
+STATUS_VERSION_KEY = "version"  # grows with every change, so unchanged status isn't re-parsed
+STATUS_PHASE_KEY = "phase"
+STATUS_ROUND_KEY = "round"  # number of Daytime phases so far
+STATUS_REMAINING_PLAYERS_KEY = "remaining_players"
+STATUS_ELIMINATED_PLAYERS_KEY = "eliminated_players"
+STATUS_WHO_WINS_KEY = "who_wins"
+STATUS_START_TIME_KEY = "start_time"
+STATUS_IS_CANCELLED_KEY = "is_cancelled"
+
+# events of the game, as recorded in the game events file
+EVENT_SEQ_KEY = "seq"
+EVENT_TIME_KEY = "time"  # seconds since the epoch, with sub-second resolution
+EVENT_TYPE_KEY = "type"
+PHASE_START_EVENT = "phase_start"
+PHASE_END_EVENT = "phase_end"
+CHAT_EVENT = "chat"
+VOTE_EVENT = "vote"
+VOTED_OUT_EVENT = "voted_out"
+GAME_OVER_EVENT = "game_over"
 
 # human player interface constants
 MANAGER_COLOR = "green"
@@ -114,6 +206,8 @@ WELCOME_MESSAGE = "Welcome to the game of Mafia!"
 GET_USER_NAME_MESSAGE = "Who are you? Enter the name's number:"
 VOTE_FLAG = "VOTE"
 NOT_TIME_TO_VOTE_MESSAGE = "This is not the time to vote yet."
+ALREADY_VOTED_MESSAGE = "You have already voted, please wait for the others to vote."
+ONLY_MAFIA_CAN_WRITE_MESSAGE = "Only mafia can write messages during nighttime."
 GET_CHAT_INPUT_MESSAGE = "> "  # f"Enter a message to the public chat: "
 VOTE_INSTRUCTION_MESSAGE = f"We are now waiting for everyone to cast their vote!\n" \
                            f"Enter '{VOTE_FLAG}' as your input to vote..."
@@ -132,6 +226,7 @@ ONLY_ONE_MAFIA_MESSAGE_END = "player in the mafia team."
 OTHER_MAFIA_NAMES_MESSAGE = "The other mafia members are:"
 MAFIA_KNOW_EACH_OTHER_MESSAGE = "The mafia members know each other's identities."
 WAITING_FOR_ALL_PLAYERS_TO_JOIN_MESSAGE = "Waiting for all players to join to start the game..."
+GAME_CANCELLED_MESSAGE = "Not all players joined in time, so the game was cancelled."
 WELCOME_INPUT_INTERFACE_MESSAGE = "This interface will only serve you to enter your messages and " \
                                   "votes.\nAll other game info, messages and chat will be " \
                                   "visible in the chat interface (run by `player_chat.py`)"
@@ -179,9 +274,38 @@ def get_current_timestamp():
     return time.strftime(TIME_FORMAT_FOR_TIMESTAMP)
 
 
-def format_message(name, message):
-    timestamp = get_current_timestamp()
-    return MESSAGE_FORMAT.format(timestamp=timestamp, name=name, message=message) + "\n"
+def format_message(name, message, seq=None):
+    if seq is None:
+        timestamp = get_current_timestamp()
+        return MESSAGE_FORMAT.format(timestamp=timestamp, name=name, message=message) + "\n"
+    now = time.time()
+    return SEQUENCED_MESSAGE_FORMAT.format(
+        timestamp=time.strftime(TIME_FORMAT_FOR_TIMESTAMP, time.localtime(now)),
+        milliseconds=int(now * 1000) % 1000, seq=seq, name=name, message=message) + "\n"
+
+
+def get_message_content(message):
+    matcher = re.match(MESSAGE_PARSING_PATTERN, message)
+    return matcher.group("content") if matcher else message.removesuffix("\n")
+
+
+def get_message_order_key(message):
+    # sequenced messages are ordered by their sequence number, older ones only by their timestamp
+    matcher = re.match(MESSAGE_PARSING_PATTERN, message)
+    if not matcher:
+        return 0
+    if matcher.group("seq") is not None:
+        return int(matcher.group("seq"))
+    return 3600 * int(matcher.group("hours")) + 60 * int(matcher.group("minutes")) + \
+        int(matcher.group("seconds"))
+
+
+def merge_message_streams(*streams, key=get_message_order_key):
+    """
+    Merges messages of several chat files (each one already in order) into a single ordered
+    stream, in linear time instead of sorting all of them.
+    """
+    return heapq.merge(*streams, key=key)
 
 
 def strip_special_chars(content):
@@ -0,0 +1,31 @@
+import json
+import time
+from game_constants import GAME_EVENTS_FILE, EVENT_SEQ_KEY, EVENT_TIME_KEY, EVENT_TYPE_KEY
+from game_io import get_game_file_writer, read_complete_lines
+
+
+def read_game_events(game_dir, drop_torn_last_line=False):
+    """All the events of a game in the order they happened, with a single linear read"""
+    return [json.loads(line) for line in
+            read_complete_lines(game_dir / GAME_EVENTS_FILE, drop_torn_last_line)]
+
+
+class GameEventLog:
+    """
+    Append-only stream of typed events of a single game, one compact JSON object per line. Each
+    event has a sequence number that only grows (also across restarts of the game manager), so
+    events from different chat rooms can be ordered without heuristics.
+    """
+
+    def __init__(self, game_dir):
+        self.path = game_dir / GAME_EVENTS_FILE
+        self.file_writer = get_game_file_writer(game_dir)
+        previous_events = read_game_events(game_dir, drop_torn_last_line=True)
+        self.next_seq = previous_events[-1][EVENT_SEQ_KEY] + 1 if previous_events else 0
+
+    def log(self, event_type, **fields):
+        event = {EVENT_SEQ_KEY: self.next_seq, EVENT_TIME_KEY: time.time(),
+                 EVENT_TYPE_KEY: event_type, **fields}
+        self.next_seq += 1
+        self.file_writer.append(self.path, json.dumps(event, separators=(",", ":")) + "\n")
+        return event
@@ -0,0 +1,191 @@
+import os
+import atexit
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from game_constants import GROUP_COMMIT_WINDOW_SECONDS, FSYNC_ON_COMMIT, STORAGE_MAX_THREADS
+
+
+class GameFileWriter:
+    """
+    Keeps the append handles of a game dir's files open for the whole game, and batches the
+    appends that arrive within `commit_window_seconds` of each other into a single write (and a
+    single flush, and optionally fsync) per file. A window of 0 writes every append immediately.
+    Appends to the same file keep their order, and files are committed in the order they were
+    first appended to in the batch.
+    If committing fails (e.g. the disk is full), the writer fails: the error is reported, and the
+    following appends raise instead of being queued without ever being written.
+    """
+
+    def __init__(self, game_dir, commit_window_seconds=GROUP_COMMIT_WINDOW_SECONDS,
+                 fsync=FSYNC_ON_COMMIT):
+        self.game_dir = Path(game_dir)
+        self.commit_window_seconds = commit_window_seconds
+        self.fsync = fsync
+        self._handles = {}
+        self._pending = {}  # path -> list of texts waiting for the next commit
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None  # why the committer failed
+        self._committer = None
+        if commit_window_seconds > 0:
+            self._committer = threading.Thread(target=self._run_committer, daemon=True)
+            self._committer.start()
+
+    def _get_path(self, file):
+        path = Path(file)
+        # accepts both file names in the game dir and paths (like the rest of the code uses)
+        return self.game_dir / path if path.parent == Path() else path
+
+    def append(self, file, text):
+        if not text:
+            return
+        with self._condition:
+            if self._closed:
+                raise ValueError(f"Writing to {file} after the game files of "
+                                 f"{self.game_dir} were closed")
+            self._raise_if_failed()
+            path = self._get_path(file)
+            is_first_in_batch = not self._pending
+            self._pending.setdefault(path, []).append(text)
+            if self._committer is None:
+                self._commit()
+            elif is_first_in_batch:
+                self._condition.notify()  # later appends join this batch without waking it
+
+    def flush(self):
+        """Commits the pending appends right away, e.g. before a status change they precede"""
+        with self._condition:
+            self._raise_if_failed()
+            self._commit()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise OSError(f"Writing the game files of {self.game_dir} has failed: "
+                          f"{self._error!r}") from self._error
+
+    def _commit(self):  # must be called while holding the lock
+        for path, texts in self._pending.items():
+            f = self._handles.get(path)
+            if f is None:
+                f = self._handles[path] = open(path, "a")
+            f.write("".join(texts))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._pending.clear()
+
+    def _run_committer(self):
+        with self._condition:
+            while not self._closed:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                self._condition.wait(self.commit_window_seconds)  # let more appends join
+                try:
+                    self._commit()
+                except Exception as e:
+                    self._error = e
+                    print(f"Failed writing the game files of {self.game_dir}: {e!r}")
+                    return
+
+    def close(self):
+        with self._condition:
+            if self._error is None:
+                self._commit()
+            self._closed = True
+            self._condition.notify()
+            for f in self._handles.values():
+                f.close()
+            self._handles.clear()
+
+
+def write_file_atomically(path, content):
+    """
+    Replaces the content of a file all at once (by writing a temporary file and renaming it), so
+    readers see either the old content or the new one, but never a truncated or partial one.
+    """
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        mode = os.stat(path).st_mode & 0o7777  # e.g. players of other users can write to it
+    except FileNotFoundError:
+        mode = None
+    with open(temp_path, "w") as f:
+        f.write(content)
+    if mode is not None:
+        os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+
+
+def read_complete_lines(path, drop_torn_last_line=False):
+    """
+    Returns the complete lines (as bytes, without their line breaks) of an append-only file, so a
+    last line that a crash cut in the middle of writing is ignored. With `drop_torn_last_line` it is
+    also truncated from the file, so lines appended after a restart don't continue it.
+    """
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return []
+    valid_length = data.rfind(b"\n") + 1
+    if drop_torn_last_line and valid_length < len(data):
+        os.truncate(path, valid_length)
+    return data[:valid_length].splitlines()
+
+
+class AsyncGameStorage:
+    """
+    Runs the blocking file work of many games on a bounded pool of threads, so a slow disk doesn't
+    stall the event loop that serves all of them. The jobs of a game run one at a time in the order
+    they were submitted, while the jobs of different games run in parallel.
+    """
+
+    def __init__(self, max_threads=STORAGE_MAX_THREADS):
+        self._executor = ThreadPoolExecutor(max_threads, thread_name_prefix="game-storage")
+        self._last_jobs = {}  # game dir -> the last job submitted for it
+
+    async def run(self, game_dir, function, *args):
+        """Runs `function(*args)` after the game's previous jobs, and returns its result"""
+        key = Path(game_dir)
+        job = asyncio.ensure_future(self._run_after(self._last_jobs.get(key), function, args))
+        self._last_jobs[key] = job
+        job.add_done_callback(lambda _: self._last_jobs.get(key) is job and self._last_jobs.pop(key))
+        # a job that started waiting its turn still runs if the caller is cancelled (e.g. disconnects)
+        return await asyncio.shield(job)
+
+    async def _run_after(self, previous_job, function, args):
+        if previous_job is not None:
+            await asyncio.wait([previous_job])  # its result or error goes to whoever submitted it
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+
+_game_file_writers = {}
+_game_file_writers_lock = threading.Lock()
+
+
+def get_game_file_writer(game_dir, **kwargs):
+    """The same writer (and handles) is shared by all modules writing to this game dir"""
+    key = Path(game_dir).resolve()
+    with _game_file_writers_lock:
+        writer = _game_file_writers.get(key)
+        if writer is None:
+            writer = _game_file_writers[key] = GameFileWriter(game_dir, **kwargs)
+        return writer
+
+
+def close_game_file_writer(game_dir):
+    with _game_file_writers_lock:
+        writer = _game_file_writers.pop(Path(game_dir).resolve(), None)
+    if writer is not None:
+        writer.close()
+
+
+@atexit.register
+def close_all_game_file_writers():
+    with _game_file_writers_lock:
+        writers = list(_game_file_writers.values())
+        _game_file_writers.clear()
+    for writer in writers:
+        writer.close()
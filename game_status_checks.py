@@ -1,28 +1,273 @@
+import re
+import json
+import time
+import asyncio
 from game_constants import NIGHTTIME, PHASE_STATUS_FILE, WHO_WINS_FILE, VOTED_OUT, \
-    PERSONAL_STATUS_FILE_FORMAT, VOTING_TIME, GAME_START_TIME_FILE, MAFIA_NAMES_FILE
+    PERSONAL_STATUS_FILE_FORMAT, VOTING_TIME, GAME_START_TIME_FILE, MAFIA_NAMES_FILE, \
+    PLAYER_NAMES_FILE, REMAINING_PLAYERS_FILE, GAME_STATUS_FILE, WAIT_UNTIL_MIN_RECHECK_SECONDS, \
+    WAIT_UNTIL_MAX_RECHECK_SECONDS, STATUS_VERSION_KEY, STATUS_PHASE_KEY, \
+    STATUS_REMAINING_PLAYERS_KEY, STATUS_ELIMINATED_PLAYERS_KEY, STATUS_WHO_WINS_KEY, \
+    STATUS_START_TIME_KEY, STATUS_IS_CANCELLED_KEY
+from file_watcher import FileChangeWaiter, get_file_signature
+
+# found without parsing the snapshot, wherever the key is (string values can't contain it unescaped)
+STATUS_VERSION_PATTERN = re.compile(rb'"' + STATUS_VERSION_KEY.encode() + rb'": (\d+)')
+
+
+def read_status_snapshot(path, cached_snapshot=None):
+    """
+    Reads the game status snapshot in a single read, and parses it only if its version differs
+    from the version of `cached_snapshot` (otherwise returns it). Returns None if there is no
+    snapshot, which is before the game manager started the game or in games from before it existed.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    match = STATUS_VERSION_PATTERN.search(data)
+    if cached_snapshot is not None and match is not None and \
+            int(match.group(1)) == cached_snapshot[STATUS_VERSION_KEY]:
+        return cached_snapshot
+    return json.loads(data)
+
+
+class GameStatus:
+    """
+    The status of a game at one moment, from a single snapshot, so several checks of it agree with
+    each other (e.g. whether it's time to vote and whether it's nighttime). Without a snapshot
+    (before the game manager publishes it, or in games from before it existed) the status files
+    are read instead.
+    """
+
+    def __init__(self, view, snapshot):
+        self._view = view
+        self.snapshot = snapshot
+
+    def _get(self, key, file_name, parse=str):
+        if self.snapshot is not None:
+            return self.snapshot.get(key)
+        return self._view._read(file_name, parse)
+
+    def get_phase(self):
+        return self._get(STATUS_PHASE_KEY, PHASE_STATUS_FILE) or ""
+
+    def get_remaining_players(self):
+        return self._get(STATUS_REMAINING_PLAYERS_KEY, REMAINING_PLAYERS_FILE, str.splitlines)
+
+    def get_who_wins(self):
+        return self._get(STATUS_WHO_WINS_KEY, WHO_WINS_FILE) or ""
+
+    def is_cancelled(self):
+        return bool(self.snapshot and self.snapshot.get(STATUS_IS_CANCELLED_KEY))
+
+    def is_nighttime(self):
+        return NIGHTTIME in self.get_phase()
+
+    def is_time_to_vote(self):
+        return VOTING_TIME in self.get_phase()
+
+    def is_game_over(self):
+        return bool(self.get_who_wins())  # if someone wins, it isn't empty
+
+    def all_players_joined(self):
+        # game is started by manager after all players joined, and then the start time is set
+        return bool(self._get(STATUS_START_TIME_KEY, GAME_START_TIME_FILE))
+
+    def is_voted_out(self, name):
+        if self.snapshot is not None:
+            return name in self.snapshot[STATUS_ELIMINATED_PLAYERS_KEY]
+        return VOTED_OUT in self._view._read(PERSONAL_STATUS_FILE_FORMAT.format(name))
+
+
+class GameStatusView:
+    """
+    Cached view of a game's status. Once the game manager publishes the status snapshot, the whole
+    status is read from it at once. Before that (and in games from before it existed) the status
+    files are read. Any of them is read again only when its stat signature (mtime, size and inode)
+    changed, and the snapshot is also parsed again only when its version changed. Files that never
+    change during the game (like the names of the mafia) are read only once.
+    """
+
+    def __init__(self, game_dir):
+        self.game_dir = game_dir
+        self._cache = {}  # file name -> (signature, parsed content)
+        self._snapshot = None
+        self._snapshot_signature = None
+
+    def _read(self, file_name, parse=str, is_immutable=False):
+        cached = self._cache.get(file_name)
+        if cached is not None and is_immutable:
+            return cached[1]
+        path = self.game_dir / file_name
+        # taken before reading, so a change in the middle is noticed again in the next call
+        signature = get_file_signature(path)
+        if cached is not None and signature is not None and cached[0] == signature:
+            return cached[1]
+        parsed = parse(path.read_text())
+        self._cache[file_name] = (signature, parsed)
+        return parsed
+
+    def get_player_names(self):
+        return self._read(PLAYER_NAMES_FILE, str.splitlines, is_immutable=True)
+
+    def get_mafia_names(self):
+        # splitlines removes the "\n"
+        return self._read(MAFIA_NAMES_FILE, lambda text: frozenset(text.splitlines()),
+                          is_immutable=True)
+
+    def get_snapshot(self):
+        """
+        The whole status at once, consistent since the file is replaced atomically. It is read
+        only when its stat signature changed, and is None until the game manager starts the game.
+        """
+        path = self.game_dir / GAME_STATUS_FILE
+        # taken before reading, so a change in the middle is noticed again in the next call
+        signature = get_file_signature(path)
+        if signature is None:
+            self._snapshot = None
+        elif signature != self._snapshot_signature:
+            self._snapshot = read_status_snapshot(path, self._snapshot)
+        self._snapshot_signature = signature
+        return self._snapshot
+
+    def get_status(self):
+        return GameStatus(self, self.get_snapshot())
+
+    def has_joined(self, name):
+        # the status file isn't empty once joined (and stays so when voted out)
+        return bool(self._read(PERSONAL_STATUS_FILE_FORMAT.format(name)))
+
+    def get_is_mafia(self, name):
+        return name in self.get_mafia_names()
+
+
+_game_status_views = {}
+
+
+def get_game_status_view(game_dir):
+    """The same view (and cache) is shared by all the status checks of this game dir"""
+    view = _game_status_views.get(game_dir)
+    if view is None:
+        view = _game_status_views.setdefault(game_dir, GameStatusView(game_dir))
+    return view
+
+
+def get_game_status(game_dir):
+    """The current status, for checking several things about the same moment of the game"""
+    return get_game_status_view(game_dir).get_status()
 
 
 def is_nighttime(game_dir):
-    return NIGHTTIME in (game_dir / PHASE_STATUS_FILE).read_text()
+    return get_game_status(game_dir).is_nighttime()
 
 
 def is_game_over(game_dir):
-    return bool((game_dir / WHO_WINS_FILE).read_text())  # if someone wins, the file isn't empty
+    return get_game_status(game_dir).is_game_over()
 
 
 def is_voted_out(name, game_dir):
-    return VOTED_OUT in (game_dir / PERSONAL_STATUS_FILE_FORMAT.format(name)).read_text()
+    return get_game_status(game_dir).is_voted_out(name)
 
 
 def is_time_to_vote(game_dir):
-    return VOTING_TIME in (game_dir / PHASE_STATUS_FILE).read_text()
+    return get_game_status(game_dir).is_time_to_vote()
 
 
 def all_players_joined(game_dir):
-    # game is started by manager after all players joined, and then the file will not be empty
-    return bool((game_dir / GAME_START_TIME_FILE).read_text())
+    return get_game_status(game_dir).all_players_joined()
+
+
+def is_cancelled(game_dir):
+    return get_game_status(game_dir).is_cancelled()
+
+
+def get_remaining_players(game_dir):
+    return get_game_status(game_dir).get_remaining_players()
+
+
+def get_who_wins(game_dir):
+    return get_game_status(game_dir).get_who_wins()
+
+
+def has_joined(name, game_dir):
+    return get_game_status_view(game_dir).has_joined(name)
 
 
 def get_is_mafia(name, game_dir):
-    mafia_names = (game_dir / MAFIA_NAMES_FILE).read_text().splitlines()  # removes the "\n"
-    return name in mafia_names
+    return get_game_status_view(game_dir).get_is_mafia(name)
+
+
+def wait_until(predicate, game_dir, file_names, timeout=None, cancel_event=None):
+    """
+    Blocks until `predicate()` is true. It is re-checked whenever one of the given files of the
+    game changes, and also after intervals that grow exponentially while nothing changes (in case
+    it depends on other things too). Stops early after `timeout` seconds or once `cancel_event`
+    (a threading.Event) is set. Returns whether the predicate became true.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    recheck_seconds = WAIT_UNTIL_MIN_RECHECK_SECONDS
+    with FileChangeWaiter(game_dir, file_names) as waiter:
+        while not predicate():
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+            remaining_seconds = None if deadline is None else deadline - time.monotonic()
+            if remaining_seconds is not None and remaining_seconds <= 0:
+                return False
+            if waiter.wait(recheck_seconds if remaining_seconds is None
+                           else min(recheck_seconds, remaining_seconds)):
+                recheck_seconds = WAIT_UNTIL_MIN_RECHECK_SECONDS
+            else:
+                recheck_seconds = min(recheck_seconds * 2, WAIT_UNTIL_MAX_RECHECK_SECONDS)
+    return True
+
+
+class JoinBarrier:
+    """
+    Lets the game manager wait for all players to join, and lets players wait for the game to
+    start (which the manager does right after everyone joined), without re-reading the status
+    files in a busy loop. Both kinds of waiting support a timeout, after which the players that
+    are still missing can be reported.
+    """
+
+    def __init__(self, game_dir):
+        self.game_dir = game_dir
+        self.player_names = get_game_status_view(game_dir).get_player_names()
+
+    def get_missing_players(self):
+        return [name for name in self.player_names if not has_joined(name, self.game_dir)]
+
+    def wait_for_game_start(self, timeout=None):
+        """
+        Returns whether the game has started, which is False if the game manager cancelled it
+        (since not all players joined in time) or if `timeout` has passed
+        """
+        def has_started_or_cancelled():
+            status = get_game_status(self.game_dir)
+            return status.all_players_joined() or status.is_cancelled()
+
+        wait_until(has_started_or_cancelled, self.game_dir, [GAME_STATUS_FILE], timeout)
+        return all_players_joined(self.game_dir)
+
+    async def wait_for_all_players(self, timeout=None, on_join=None):
+        """
+        Waits until all players joined, calling `on_join` with the name of each one that joins.
+        Returns the names of the players still missing, which is empty unless `timeout` passed.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        status_files = [PERSONAL_STATUS_FILE_FORMAT.format(name) for name in self.player_names]
+        with FileChangeWaiter(self.game_dir, status_files) as waiter:
+            missing_players = self.get_missing_players()
+            while missing_players:
+                remaining_seconds = None if deadline is None else deadline - loop.time()
+                if remaining_seconds is not None and remaining_seconds <= 0:
+                    break
+                if not await waiter.wait_async(timeout=remaining_seconds):
+                    continue
+                still_missing_players = self.get_missing_players()
+                if on_join is not None:
+                    for name in missing_players:
+                        if name not in still_missing_players:
+                            on_join(name)
+                missing_players = still_missing_players
+        return missing_players
@@ -1,8 +1,12 @@
+import sys
 import json
 import random
 from game_constants import *  # incl. argparse, time, Path (from pathlib), colored (from termcolor)
-from game_status_checks import is_nighttime, is_game_over, is_voted_out, is_time_to_vote, \
-    all_players_joined
+from game_status_checks import is_nighttime, is_game_over, is_time_to_vote, \
+    get_remaining_players, get_game_status, JoinBarrier, wait_until
+from game_io import get_game_file_writer
+from game_clock import GameClock, get_game_clock
+from chat_bus import ChatBusReader
 from llm_players.factory import llm_player_factory
 from llm_players.llm_constants import GAME_DIR_KEY, VOTING_WAITING_TIME, MAX_TIME_TO_WAIT
 
@@ -17,15 +21,17 @@ GET_LLM_PLAYER_NAME_MESSAGE = "This game has multiple LLM players, which one you
 ELIMINATED_MESSAGE = "This LLM player was eliminated from the game..."
 
 
-# global variable
+# global variables
 game_dir = Path()  # will be updated in get_llm_player
+clock = GameClock()  # will be updated in get_llm_player
 
 
 def get_llm_player():
-    global game_dir
+    global game_dir, clock
     game_dir = get_game_dir_from_argv()
     with open(game_dir / GAME_CONFIG_FILE) as f:
         config = json.load(f)
+    clock = get_game_clock(config)
     llm_players_configs = [player for player in config[PLAYERS_KEY_IN_CONFIG] if player["is_llm"]]
     if not llm_players_configs:
         raise ValueError("No LLM player configured in this game")
@@ -42,11 +48,19 @@ def get_llm_player():
     return llm_player
 
 
-def read_messages_from_file(message_history, file_name, num_read_lines):
+def read_messages_from_file(file_name, num_read_lines):
     with open(game_dir / file_name, "r") as f:
-        lines = f.readlines()[num_read_lines:]
-    message_history.extend(lines)
-    return len(lines)
+        return f.readlines()[num_read_lines:]
+
+
+def read_new_messages(public_chat_files, num_read_lines):
+    # only current phase file will have new messages, so no need to run expensive is_nighttime()
+    new_lines_by_file = []
+    for file_name in public_chat_files:
+        lines = read_messages_from_file(file_name, num_read_lines[file_name])
+        num_read_lines[file_name] += len(lines)
+        new_lines_by_file.append(lines)
+    return merge_message_streams(*new_lines_by_file)
 
 
 def wait_writing_time(player, message):
@@ -55,7 +69,7 @@ def wait_writing_time(player, message):
         time_to_wait = min(num_words // player.num_words_per_second_to_wait, MAX_TIME_TO_WAIT)
         if is_nighttime(game_dir):
             time_to_wait //= 2
-        time.sleep(time_to_wait)
+        clock.sleep(time_to_wait)
         # TODO: leave only working part
         # time.sleep(num_words // player.num_words_per_second_to_wait)
         # time.sleep(num_words // player.num_words_per_second_to_wait + 2)
@@ -70,7 +84,7 @@ def eliminate(player):
 
 
 def get_vote_from_llm(player, message_history):
-    candidate_vote_names = (game_dir / REMAINING_PLAYERS_FILE).read_text().splitlines()
+    candidate_vote_names = list(get_remaining_players(game_dir))
     candidate_vote_names.remove(player.name)
     voting_message = player.get_vote(message_history, candidate_vote_names)
     for name in candidate_vote_names:
@@ -86,26 +100,30 @@ def get_vote_from_llm(player, message_history):
 
 
 def update_vote(voted_name, player):
-    time.sleep(VOTING_WAITING_TIME)
-    with open(game_dir / PERSONAL_VOTE_FILE_FORMAT.format(player.name), "a") as f:
-        f.write(voted_name + "\n")
+    clock.sleep(VOTING_WAITING_TIME)
+    get_game_file_writer(game_dir).append(PERSONAL_VOTE_FILE_FORMAT.format(player.name),
+                                          voted_name + "\n")
     print(colored(LLM_VOTE_MESSAGE_FORMAT.format(voted_name), OPERATOR_COLOR))
 
 
 def add_message_to_game(player, message_history):
     is_nighttime_at_start = is_nighttime(game_dir)
     if not player.is_mafia and is_nighttime_at_start:
-        return  # only mafia can communicate during nighttime
+        # only mafia can communicate during nighttime
+        wait_until(lambda: not is_nighttime(game_dir) or is_game_over(game_dir), game_dir,
+                   [GAME_STATUS_FILE])
+        return
     message = player.generate_message(message_history).strip()
     if is_time_to_vote(game_dir):
         return  # sometimes the messages is generated when it's already too late, so drop it
     if message:
         # artificially making the model taking time to write the message
         wait_writing_time(player, message)
-        if is_nighttime(game_dir) != is_nighttime_at_start or is_time_to_vote(game_dir):
+        status = get_game_status(game_dir)
+        if status.is_nighttime() != is_nighttime_at_start or status.is_time_to_vote():
             return  # waited for too long
-        with open(game_dir / PERSONAL_CHAT_FILE_FORMAT.format(player.name), "a") as f:
-            f.write(format_message(player.name, message))
+        get_game_file_writer(game_dir).append(PERSONAL_CHAT_FILE_FORMAT.format(player.name),
+                                              format_message(player.name, message))
         print(colored(MODEL_CHOSE_TO_USE_TURN_LOG, OPERATOR_COLOR))
     else:
         print(colored(MODEL_CHOSE_TO_PASS_TURN_LOG, OPERATOR_COLOR))
@@ -119,29 +137,32 @@ def end_game(eliminated: bool):
 def main():
     player = get_llm_player()
     print(colored(LLM_PLAYER_LOADED_MESSAGE, OPERATOR_COLOR))
-    while not all_players_joined(game_dir):
-        continue
+    if not JoinBarrier(game_dir).wait_for_game_start():
+        print(colored(GAME_CANCELLED_MESSAGE, OPERATOR_COLOR))
+        sys.exit()
     print(colored(ALL_PLAYERS_JOINED_MESSAGE, OPERATOR_COLOR))
     message_history = []
-    num_read_lines_manager = num_read_lines_daytime = num_read_lines_nighttime = 0
+    public_chat_files = [PUBLIC_MANAGER_CHAT_FILE, PUBLIC_DAYTIME_CHAT_FILE]
+    if player.is_mafia:  # only mafia can see what happens during nighttime
+        public_chat_files.append(PUBLIC_NIGHTTIME_CHAT_FILE)
+    num_read_lines = {file_name: 0 for file_name in public_chat_files}
+    # attached after the game started, since the game manager creates it before that
+    chat_bus_reader = ChatBusReader.attach(game_dir, public_chat_files)
     eliminated = False
     while not is_game_over(game_dir):
-        num_read_lines_manager += read_messages_from_file(
-            message_history, PUBLIC_MANAGER_CHAT_FILE, num_read_lines_manager)
-        # only current phase file will have new messages, so no need to run expensive is_nighttime()
-        num_read_lines_daytime += read_messages_from_file(
-            message_history, PUBLIC_DAYTIME_CHAT_FILE, num_read_lines_daytime)
-        if player.is_mafia:  # only mafia can see what happens during nighttime
-            num_read_lines_nighttime += read_messages_from_file(
-                message_history, PUBLIC_NIGHTTIME_CHAT_FILE, num_read_lines_nighttime)
-        if is_voted_out(player.name, game_dir):
+        if chat_bus_reader is not None:  # already in the order they were relayed
+            message_history.extend(line for _, line in chat_bus_reader.read_new_lines())
+        else:
+            message_history.extend(read_new_messages(public_chat_files, num_read_lines))
+        status = get_game_status(game_dir)  # all the checks are of the same moment
+        if status.is_voted_out(player.name):
             eliminate(player)
             eliminated = True
             break
-        if is_time_to_vote(game_dir) and (player.is_mafia or not is_nighttime(game_dir)):
+        if status.is_time_to_vote() and (player.is_mafia or not status.is_nighttime()):
             get_vote_from_llm(player, message_history)
-            while is_time_to_vote(game_dir):
-                continue  # wait for voting time to end when all players have voted
+            # wait for voting time to end when all players have voted
+            wait_until(lambda: not is_time_to_vote(game_dir), game_dir, [GAME_STATUS_FILE])
         add_message_to_game(player, message_history)
     end_game(eliminated)
 
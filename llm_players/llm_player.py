@@ -51,7 +51,7 @@ class LLMPlayer(ABC):
                     matcher = re.match(MESSAGE_PARSING_PATTERN, message)
                     if not matcher:
                         continue
-                    message_content = matcher.group(5)  # depends on MESSAGE_PARSING_PATTERN
+                    message_content = matcher.group("content")
                     system_info += f"* \"{message_content}\"\n"
         if only_special_tokens:
             system_info += f"You can ONLY respond with one of two possible outputs:\n" \
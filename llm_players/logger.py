@@ -1,5 +1,6 @@
 from pathlib import Path
 from game_constants import LLM_LOG_FILE_FORMAT, get_current_timestamp
+from game_io import get_game_file_writer
 
 NEW_LOG_FORMAT = "# NEW LOG\n## TIME: {time}\n## OPERATION: {operation}\n## CONTENT: {content}\n\n"
 
@@ -8,8 +9,8 @@ class Logger:
 
     def __init__(self, name: str, game_dir: Path):
         self.log_file = game_dir / LLM_LOG_FILE_FORMAT.format(name)
+        self.game_file_writer = get_game_file_writer(game_dir)
 
     def log(self, operation, content):
-        with open(self.log_file, "a") as f:
-            f.write(NEW_LOG_FORMAT.format(time=get_current_timestamp(),
-                                          operation=operation, content=content))
+        self.game_file_writer.append(self.log_file, NEW_LOG_FORMAT.format(
+            time=get_current_timestamp(), operation=operation, content=content))
@@ -13,7 +13,7 @@ def no_one_has_talked_yet_in_current_phase(message_history):
     matcher = re.match(MESSAGE_PARSING_PATTERN, message_history[-1])
     if not matcher:
         return True
-    name = matcher.group(4)  # depends on MESSAGE_PARSING_PATTERN
+    name = matcher.group("name")
     return name == GAME_MANAGER_NAME
 
 
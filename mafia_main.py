@@ -1,206 +1,655 @@
 import json
 import os
+import asyncio
+import random
+import threading
 from game_constants import *  # incl. argparse, time, Path (from pathlib), colored (from termcolor)
-
-
-# global variable for the game dir
-game_dir = Path()  # will be updated only if __name__ == __main__ (prevents new ones in imports)
+from file_watcher import FileChangeWaiter, wait_for_changes_or_event
+from tail_reader import TailReader
+from game_io import get_game_file_writer, close_game_file_writer, write_file_atomically, \
+    read_complete_lines
+from game_status_checks import JoinBarrier
+from game_events import GameEventLog
+from game_clock import get_game_clock
+from chat_bus import ChatBusWriter
+
+try:
+    import fcntl
+except ImportError:  # not Unix, so games aren't locked against being run twice
+    fcntl = None
+
+
+class GameAlreadyRunningError(RuntimeError):
+    pass
+
+
+def acquire_game_lock(game_dir):
+    """
+    Returns the lock file, locked as long as it's open, so that no other game manager (another
+    mafia_main.py, the orchestrator or the web server's engine) runs the game at the same time
+    """
+    # read-only, so game managers of other users (that may read the game dir) can lock it too
+    lock_file = os.fdopen(os.open(game_dir / GAME_MANAGER_LOCK_FILE, os.O_RDONLY | os.O_CREAT,
+                                  0o666))
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise GameAlreadyRunningError(
+                f"Another game manager already runs the game in {game_dir}")
+    return lock_file
+
+
+class PlayerInbox:
+    """
+    In-memory input of a player, for a game that runs inside the web server: the server puts the
+    player's messages and votes here, so they reach the game manager without going through the
+    files. The server still appends them to the personal files, which remain the durable record.
+    The server and the game manager may run in different threads.
+    """
+
+    def __init__(self):
+        self.chat_lines = []
+        self.votes = []
+        self.on_put = None  # wakes up the game manager, set once it uses the inbox
+        self._lock = threading.Lock()
+
+    def _put(self, items, item):
+        with self._lock:
+            items.append(item)
+        if self.on_put is not None:
+            self.on_put()
+
+    def put_chat_line(self, line):
+        self._put(self.chat_lines, line)
+
+    def put_vote(self, voted_for):
+        self._put(self.votes, voted_for)
+
+    def pop_chat_lines(self):
+        with self._lock:
+            chat_lines, self.chat_lines = self.chat_lines, []
+        return chat_lines
+
+    def pop_vote(self):
+        with self._lock:
+            votes, self.votes = self.votes, []
+        return votes[-1] if votes else None
 
 
 class Player:
 
-    def __init__(self, name, is_mafia, **kwargs):
+    def __init__(self, name, is_mafia, game_dir, is_llm=False, **kwargs):
         self.name = name
         self.is_mafia = is_mafia
+        self.is_llm = is_llm
+        self.inbox = None  # when set, the player's input is read from it instead of the files
         self.personal_chat_file = game_dir / PERSONAL_CHAT_FILE_FORMAT.format(self.name)
-        self.personal_chat_file_lines_read = 0
+        self.personal_chat_reader = TailReader(self.personal_chat_file)
         self.personal_vote_file = game_dir / PERSONAL_VOTE_FILE_FORMAT.format(self.name)
-        self.personal_vote_file_lines_read = 0
+        self.personal_vote_reader = TailReader(self.personal_vote_file)
         # status is whether the player has joined and then whether was voted out
         self.personal_status_file = game_dir / PERSONAL_STATUS_FILE_FORMAT.format(self.name)
 
     def get_new_messages(self):
-        with open(self.personal_chat_file, "r") as f:
-            # the readlines method includes the "\n"
-            lines = f.readlines()[self.personal_chat_file_lines_read:]
-        self.personal_chat_file_lines_read += len(lines)
-        return lines
+        if self.inbox is not None:
+            return self.inbox.pop_chat_lines()
+        return self.personal_chat_reader.read_new_lines()  # lines include the "\n"
 
     def get_voted_player(self):
-        all_votes = self.personal_vote_file.read_text().splitlines()
-        new_votes = all_votes[self.personal_vote_file_lines_read:]
+        if self.inbox is not None:
+            return self.inbox.pop_vote()
+        new_votes = self.personal_vote_reader.read_new_lines()  # should be 1 if works correctly
         if new_votes:
-            self.personal_vote_file_lines_read += len(new_votes)  # should be 1 if works correctly
             return new_votes[-1].strip()
         else:
             return None
 
-    def eliminate(self):
-        self.personal_status_file.write_text(VOTED_OUT)
-
-
-def get_config():
+    def skip_pending_messages(self):
+        if self.inbox is not None:
+            self.inbox.pop_chat_lines()
+        else:
+            self.personal_chat_reader.skip_to_end()
+
+    def skip_pending_votes(self):
+        """Returns the offset in the vote file from which the votes of the starting voting are"""
+        if self.inbox is not None:
+            self.inbox.pop_vote()
+            return self.personal_vote_file.stat().st_size if self.personal_vote_file.exists() else 0
+        self.personal_vote_reader.skip_to_end()
+        return self.personal_vote_reader.offset
+
+    def resume_votes_from(self, offset):
+        """
+        After the game manager restarted in the middle of a voting, reads again the votes written
+        since it started (including while the game manager was down, into the file by the server
+        when the player has an inbox)
+        """
+        self.personal_vote_reader.close()
+        self.personal_vote_reader = TailReader(self.personal_vote_file, offset)
+        if self.inbox is not None:
+            votes = self.personal_vote_reader.read_new_lines()
+            if votes:
+                self.inbox.put_vote(votes[-1].strip())
+
+
+def get_config(game_dir):
     with open(game_dir / GAME_CONFIG_FILE, "r") as f:
         config = json.load(f)
     return config
 
 
-def get_players(config):
-    return [Player(**player_config) for player_config in config[PLAYERS_KEY_IN_CONFIG]]
-
-
-def is_win_by_bystanders(mafia_players):
-    if len(mafia_players) == 0:
-        (game_dir / WHO_WINS_FILE).write_text(BYSTANDERS_WIN_MESSAGE)
-        return True
-    return False
-
-
-def is_win_by_mafia(mafia_players, bystanders):
-    if len(mafia_players) >= len(bystanders):
-        (game_dir / WHO_WINS_FILE).write_text(MAFIA_WINS_MESSAGE)
+def get_players(config, game_dir):
+    return [Player(game_dir=game_dir, **player_config)
+            for player_config in config[PLAYERS_KEY_IN_CONFIG]]
+
+
+class GameJournal:
+    """
+    Append-only log of the game state transitions, one compact JSON object per line. Every
+    transition is written before it is applied, so replaying the journal after a crash rebuilds
+    the state that the game manager had.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def recover(self):
+        """Returns the transitions that were journaled so far, and drops a torn last line"""
+        # a transition that crashed in the middle of being written was never applied
+        return [json.loads(line)
+                for line in read_complete_lines(self.path, drop_torn_last_line=True)]
+
+    def append(self, transition):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps(transition, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if FSYNC_ON_COMMIT:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class GameState:
+    """
+    The authoritative state of a game, which changes only by applying transitions. The game
+    manager never reads it back from the text files, these are only derived from it for players.
+    """
+
+    def __init__(self, player_names, mafia_names):
+        self.version = 0  # number of transitions applied so far
+        self.remaining_players = list(player_names)
+        self.eliminated_players = []
+        self.mafia_names = set(mafia_names)
+        self.num_remaining_mafia = len(self.mafia_names)
+        self.start_time = None
+        self.phase = None
+        self.phase_ends_at = None  # seconds since the epoch, so the deadline outlives a restart
+        self.round = 0
+        self.is_phase_over = False  # whether someone was already voted out in the current phase
+        self.votes = []  # (voter, voted for) of the current voting, in the order they were cast
+        self.vote_file_offsets = {}  # voter -> offset in their vote file where the voting started
+        self.who_wins = None
+        self.is_cancelled = False
+
+    def get_winner_message(self):
+        num_remaining_bystanders = len(self.remaining_players) - self.num_remaining_mafia
+        if self.num_remaining_mafia == 0:
+            return BYSTANDERS_WIN_MESSAGE
+        if self.num_remaining_mafia >= num_remaining_bystanders:
+            return MAFIA_WINS_MESSAGE
+        return None
+
+    def get_snapshot(self):
+        return {STATUS_VERSION_KEY: self.version, STATUS_PHASE_KEY: self.phase,
+                STATUS_ROUND_KEY: self.round, STATUS_REMAINING_PLAYERS_KEY: self.remaining_players,
+                STATUS_ELIMINATED_PLAYERS_KEY: self.eliminated_players,
+                STATUS_WHO_WINS_KEY: self.who_wins, STATUS_START_TIME_KEY: self.start_time,
+                STATUS_IS_CANCELLED_KEY: self.is_cancelled}
+
+    def apply(self, transition):
+        transition_type = transition[TRANSITION_TYPE_KEY]
+        if transition_type == GAME_STARTED_TRANSITION:
+            self.start_time = transition["start_time"]
+        elif transition_type == PHASE_CHANGED_TRANSITION:
+            previous_phase, self.phase = self.phase, transition["phase"]
+            if self.phase == DAYTIME and not (previous_phase or "").startswith(DAYTIME):
+                self.round += 1
+            self.phase_ends_at = transition.get("ends_at")
+            self.is_phase_over = False
+            self.votes = []
+            self.vote_file_offsets = transition.get("vote_file_offsets", {})
+        elif transition_type == VOTE_CAST_TRANSITION:
+            self.votes.append((transition["voter"], transition["voted_for"]))
+        elif transition_type == PLAYER_ELIMINATED_TRANSITION:
+            self.remaining_players.remove(transition["name"])
+            self.eliminated_players.append(transition["name"])
+            if transition["name"] in self.mafia_names:
+                self.num_remaining_mafia -= 1
+            self.is_phase_over = True
+            # voting is over, in the same status change, so nobody is asked to vote again before
+            # the next phase starts
+            self.phase = self.phase.replace(VOTING_TIME, "")
+        elif transition_type == GAME_WON_TRANSITION:
+            self.who_wins = transition["who_wins"]
+        elif transition_type == GAME_CANCELLED_TRANSITION:
+            self.is_cancelled = True
+        else:
+            raise ValueError(f"Unknown game state transition: {transition}")
+        self.version += 1
+
+
+class VoteCollector:
+    """
+    Collects the votes of a voting sub-phase while keeping a running tally, blocking on changes
+    of the vote files in between. Voting closes when everyone voted, when the deadline passed
+    (players who didn't vote by then are treated as not voting), or optionally as soon as the
+    remaining votes can no longer change who is voted out.
+    """
+
+    def __init__(self, game, voting_players, optional_votes_players, public_chat_file):
+        self.game = game
+        self.votes = {player.name: 0 for player in optional_votes_players}
+        self.missing_voters = voting_players[:]
+        self.num_cast_votes = 0  # including the invalid ones, which aren't in `votes`
+        self.public_chat_file = public_chat_file
+        for voter, voted_for in game.state.votes:  # journaled before the game manager restarted
+            self.count_vote(voter, voted_for)
+
+    def count_vote(self, voter, voted_for):
+        """Returns whether the vote is valid"""
+        self.missing_voters = [player for player in self.missing_voters if player.name != voter]
+        self.num_cast_votes += 1
+        if voted_for not in self.votes:
+            return False
+        self.votes[voted_for] += 1
         return True
-    return False
 
-
-def is_game_over(players):
-    mafia_players = [player for player in players if player.is_mafia]
-    bystanders = [player for player in players if not player.is_mafia]
-    return is_win_by_bystanders(mafia_players) or is_win_by_mafia(mafia_players, bystanders)
-
-
-def run_chat_round_between_players(players, chat_room):
-    for player in players:
-        lines = player.get_new_messages()
-        with open(chat_room, "a") as f:
-            f.writelines(lines)  # lines already include "\n"
-
-
-def notify_players_about_voting_time(phase_name, public_chat_file):
-    phase_end_message = DAYTIME_VOTING_TIME_MESSAGE if phase_name == DAYTIME else NIGHTTIME_VOTING_TIME_MESSAGE
-    with open(public_chat_file, "a") as f:  # only to the current phase's active players chat room
-        f.write(format_message(GAME_MANAGER_NAME, phase_end_message))
-    voting_phase_name = DAYTIME_VOTING_TIME if phase_name == DAYTIME else NIGHTTIME_VOTING_TIME
-    (game_dir / PHASE_STATUS_FILE).write_text(voting_phase_name)
-
-
-def get_voted_out_name(optional_votes_players, public_chat_file, voting_players):
-    votes = {player.name: 0 for player in optional_votes_players}
-    while voting_players:
-        voted_players = []
-        for player in voting_players:
+    def collect_new_votes(self):
+        for player in self.missing_voters[:]:
             voted_for = player.get_voted_player()
             if not voted_for:
                 continue
-            voted_players.append(player)
-            if voted_for in votes:
-                with open(public_chat_file, "a") as f:
-                    voting_message = VOTING_MESSAGE_FORMAT.format(player.name, voted_for)
-                    f.write(format_message(GAME_MANAGER_NAME, voting_message))
-                votes[voted_for] += 1
-        for player in voted_players:
-            voting_players.remove(player)
-    # if there were invalid votes or if there was a tie, decision will be made "randomly"
-    voted_out_name = max(votes, key=votes.get)
-    return voted_out_name
-
-
-def voting_sub_phase(phase_name, voting_players, optional_votes_players, public_chat_file, players):
-    notify_players_about_voting_time(phase_name, public_chat_file)
-    voted_out_name = get_voted_out_name(optional_votes_players, public_chat_file, voting_players[:])
-    # update info file of remaining players
-    remaining_players = (game_dir / REMAINING_PLAYERS_FILE).read_text().splitlines()
-    try:
-        remaining_players.remove(voted_out_name)
-    except ValueError:
-        print(f"BUG: voted_out_name is {voted_out_name}, which is not in remaining_players")
-    (game_dir / REMAINING_PLAYERS_FILE).write_text("\n".join(remaining_players))
-    # update player object status
-    voted_out_player = {player.name: player for player in optional_votes_players}[voted_out_name]
-    voted_out_player.eliminate()
-    players.remove(voted_out_player)
-    announce_voted_out_player(voted_out_player)
-
-
-def game_manager_announcement(message):
-    with open(game_dir / PUBLIC_MANAGER_CHAT_FILE, "a") as f:
-        f.write(format_message(GAME_MANAGER_NAME, message))
-
-
-def announce_voted_out_player(voted_out_player):
-    role = get_role_string(voted_out_player.is_mafia)
-    voted_out_message = VOTED_OUT_MESSAGE_FORMAT.format(voted_out_player.name, role)
-    game_manager_announcement(voted_out_message)
-
-
-def run_phase(players, voting_players, optional_votes_players, public_chat_file,
-              time_limit_seconds, phase_name):
-    if len(voting_players) > 1:
-        start_time = time.time()
-        while time.time() - start_time < time_limit_seconds:
-            run_chat_round_between_players(voting_players, public_chat_file)
-    else:
-        game_manager_announcement(CUTTING_TO_VOTE_MESSAGE)
-    print("Now voting starts...")
-    voting_sub_phase(phase_name, voting_players, optional_votes_players, public_chat_file, players)
-
-
-def run_nighttime(players, nighttime_minutes):
-    (game_dir / PHASE_STATUS_FILE).write_text(NIGHTTIME)
-    mafia_players = [player for player in players if player.is_mafia]
-    bystanders = [player for player in players if not player.is_mafia]
-    print(colored(NIGHTTIME_START_MESSAGE_FORMAT.format(nighttime_minutes), NIGHTTIME_COLOR))
-    game_manager_announcement(NIGHTTIME_START_MESSAGE_FORMAT.format(nighttime_minutes))
-    run_phase(players, mafia_players, bystanders, game_dir / PUBLIC_NIGHTTIME_CHAT_FILE,
-              minutes_to_seconds(nighttime_minutes), NIGHTTIME)
-
-
-def run_daytime(players, daytime_minutes):
-    (game_dir / PHASE_STATUS_FILE).write_text(DAYTIME)
-    print(colored(DAYTIME_START_MESSAGE_FORMAT.format(daytime_minutes), DAYTIME_COLOR))
-    game_manager_announcement(DAYTIME_START_MESSAGE_FORMAT.format(daytime_minutes))
-    run_phase(players, players, players, game_dir / PUBLIC_DAYTIME_CHAT_FILE,
-              minutes_to_seconds(daytime_minutes), DAYTIME)
-
-
-def wait_for_players(players):
-    havent_joined_yet = [player for player in players]
-    print("Waiting for all players to connect and start running their programs to join:")
-    print(",  ".join([player.name for player in havent_joined_yet]))
-    while havent_joined_yet:
-        joined = []
-        for player in havent_joined_yet:
-            if bool(player.personal_status_file.read_text()):  # file isn't empty once joined
-                joined.append(player)
-                print(f"{player.name} has joined!")
-        for player in joined:
-            havent_joined_yet.remove(player)
-    (game_dir / GAME_START_TIME_FILE).write_text(get_current_timestamp())
-    print("Game is now running! Its content is displayed to players.")
-
-
-def get_all_player_out_of_voting_time():
-    current_phase = (game_dir / PHASE_STATUS_FILE).read_text()
-    (game_dir / PHASE_STATUS_FILE).write_text(current_phase.replace(VOTING_TIME, ""))
-
-
-def end_game():
-    get_all_player_out_of_voting_time()
-    print("Game has finished.")
+            self.game.apply_transition(VOTE_CAST_TRANSITION, voter=player.name, voted_for=voted_for)
+            if self.count_vote(player.name, voted_for):
+                self.game.events.log(VOTE_EVENT, voter=player.name, voted_for=voted_for)
+                voting_message = VOTING_MESSAGE_FORMAT.format(player.name, voted_for)
+                self.game.write_manager_message(self.public_chat_file, voting_message)
+
+    def is_outcome_decided(self):
+        leading, runner_up = (sorted(self.votes.values(), reverse=True) + [0])[:2]
+        # strictly more, since a tie is decided by the order of `votes` and not by the leader
+        return leading - runner_up > len(self.missing_voters)
+
+    def announce_missing_voters(self):
+        if self.missing_voters:
+            missing_votes_message = MISSING_VOTES_MESSAGE_FORMAT.format(
+                ", ".join([player.name for player in self.missing_voters]))
+            self.game.write_manager_message(self.public_chat_file, missing_votes_message)
+
+    async def get_voted_out_name(self, time_limit_seconds=None, stop_early=False):
+        loop = asyncio.get_running_loop()
+        deadline = None if time_limit_seconds is None else loop.time() + time_limit_seconds
+        vote_files = [player.personal_vote_file.name for player in self.missing_voters
+                      if player.inbox is None]
+        with self.game.get_input_waiter(vote_files) as waiter:
+            self.collect_new_votes()
+            while self.missing_voters and not (stop_early and self.is_outcome_decided()):
+                remaining_seconds = None if deadline is None else deadline - loop.time()
+                if remaining_seconds is not None and remaining_seconds <= 0:
+                    break
+                if await self.game.wait_for_input(waiter, remaining_seconds):
+                    self.collect_new_votes()
+        self.announce_missing_voters()
+        if not any(self.votes.values()):
+            # e.g. voting closed at its deadline before anyone voted, or all the votes were invalid
+            voted_out_name = random.choice(list(self.votes))
+            message_format = NO_VALID_VOTES_MESSAGE_FORMAT if self.num_cast_votes \
+                else NO_VOTES_MESSAGE_FORMAT
+            self.game.write_manager_message(self.public_chat_file,
+                                            message_format.format(voted_out_name))
+            return voted_out_name
+        # if there were invalid votes or if there was a tie, decision will be made "randomly"
+        voted_out_name = max(self.votes, key=self.votes.get)
+        return voted_out_name
+
+
+class Game:
+    """
+    A single game, driven by the `run` coroutine. Its state is kept in memory and journaled, so a
+    game manager that crashed can be started again and continue the game from where it was.
+    Many games can run concurrently in the same event loop, since all the waiting (for players,
+    messages, votes and phase deadlines) is done asynchronously.
+    With `inboxes` (player name -> PlayerInbox, when the web server runs the game) the human
+    players' input comes from their inboxes, and `on_update` is called whenever the game files
+    change. Then the game must be created in the event loop that runs it, which may be another
+    thread than the one putting into the inboxes.
+    Creating a game raises GameAlreadyRunningError if another game manager runs it, before any of
+    its files is touched.
+    """
+
+    def __init__(self, game_dir, operator_prefix="", inboxes=None, on_update=None,
+                 default_join_timeout_minutes=DEFAULT_JOIN_TIMEOUT_MINUTES):
+        self.game_dir = game_dir
+        self.config = get_config(game_dir)
+        self.all_players = {player.name: player for player in get_players(self.config, game_dir)}
+        self.state = GameState(self.all_players,
+                               [player.name for player in self.all_players.values()
+                                if player.is_mafia])
+        self.lock_file = acquire_game_lock(game_dir)
+        self.default_join_timeout_minutes = default_join_timeout_minutes  # if the config has none
+        self.journal = GameJournal(game_dir / GAME_JOURNAL_FILE)
+        for transition in self.journal.recover():
+            self.state.apply(transition)
+        self.file_writer = get_game_file_writer(game_dir)
+        self.events = GameEventLog(game_dir)
+        self.chat_bus = ChatBusWriter(game_dir) \
+            if self.config.get(USE_CHAT_BUS_KEY, DEFAULT_USE_CHAT_BUS) else None
+        self.clock = get_game_clock(self.config)  # joining is the only waiting in real time
+        self.is_sequencing_messages = self.config.get(
+            MESSAGE_FORMAT_VERSION_KEY, DEFAULT_MESSAGE_FORMAT_VERSION) >= 2
+        self.operator_prefix = operator_prefix  # tells games apart when printing to the operator
+        self.input_event = asyncio.Event() if inboxes is not None else None  # set by the inboxes
+        if inboxes is not None:
+            loop = asyncio.get_running_loop()
+            for player in self.all_players.values():
+                if not player.is_llm:  # LLM players still write their input to the files
+                    player.inbox = inboxes.setdefault(player.name, PlayerInbox())
+                    player.inbox.on_put = lambda: loop.call_soon_threadsafe(self.input_event.set)
+        self.on_update = on_update
+
+    @property
+    def players(self):  # only the remaining ones
+        return [self.all_players[name] for name in self.state.remaining_players]
+
+    def print_to_operator(self, message, color=None):
+        print(self.operator_prefix + (colored(message, color) if color else message))
+
+    def update_status_file(self, file_name, content):
+        self.file_writer.flush()  # so messages written before a status change are seen first
+        write_file_atomically(self.game_dir / file_name, content)
+        if self.on_update is not None:
+            self.on_update()
+
+    def write_chat_lines(self, chat_file, name, lines):
+        for line in lines:  # lines already include "\n"
+            if self.is_sequencing_messages:
+                # restamped when relayed, sharing the sequence number of its chat event
+                line = format_message(name, get_message_content(line), seq=self.events.next_seq)
+            self.events.log(CHAT_EVENT, room=Path(chat_file).name, name=name,
+                            line=line.removesuffix("\n"))
+            if self.chat_bus is not None:
+                self.chat_bus.publish(Path(chat_file).name, line)  # before the file grows
+            self.file_writer.append(chat_file, line)
+        if self.on_update is not None and lines:
+            self.file_writer.flush()  # so the readers that are told about the lines find them
+            self.on_update()
+
+    def get_input_waiter(self, input_files):
+        """Waits for changes of the given personal files, which players without inboxes write to"""
+        # without files only the inboxes are waited for, so there are no directory events to watch
+        return FileChangeWaiter(self.game_dir, input_files, use_inotify=bool(input_files))
+
+    async def wait_for_input(self, waiter, timeout):
+        """Returns whether there is new input, in the files of `waiter` or in the inboxes"""
+        if self.input_event is None:
+            return await waiter.wait_async(timeout=timeout)
+        return await wait_for_changes_or_event(waiter, self.input_event, timeout)
+
+    def write_manager_message(self, chat_file, message):
+        self.write_chat_lines(chat_file, GAME_MANAGER_NAME,
+                              [format_message(GAME_MANAGER_NAME, message)])
+
+    def game_manager_announcement(self, message):
+        self.write_manager_message(PUBLIC_MANAGER_CHAT_FILE, message)
+
+    def apply_transition(self, transition_type, **fields):
+        transition = {TRANSITION_TYPE_KEY: transition_type, **fields}
+        self.journal.append(transition)  # first, so a crash right after it is replayed correctly
+        self.state.apply(transition)
+        self.update_derived_files(transition)
+
+    def update_derived_files(self, transition=None):
+        # without a transition all the files are updated, e.g. after recovering from the journal
+        transition_type = transition[TRANSITION_TYPE_KEY] if transition else None
+        if transition_type in (None, GAME_STARTED_TRANSITION) and self.state.start_time:
+            self.update_status_file(GAME_START_TIME_FILE, self.state.start_time)
+        if transition_type in (None, PHASE_CHANGED_TRANSITION, PLAYER_ELIMINATED_TRANSITION) and \
+                self.state.phase:
+            self.update_status_file(PHASE_STATUS_FILE, self.state.phase)
+        if transition_type in (None, PLAYER_ELIMINATED_TRANSITION):
+            self.update_status_file(REMAINING_PLAYERS_FILE, "\n".join(self.state.remaining_players))
+            eliminated_names = [transition["name"]] if transition else \
+                [name for name in self.all_players if name not in self.state.remaining_players]
+            for name in eliminated_names:
+                self.update_status_file(PERSONAL_STATUS_FILE_FORMAT.format(name), VOTED_OUT)
+        if transition_type in (None, GAME_WON_TRANSITION) and self.state.who_wins:
+            self.update_status_file(WHO_WINS_FILE, self.state.who_wins)
+        # last, so once its version changes all the other files are already up to date
+        self.update_status_file(GAME_STATUS_FILE, json.dumps(self.state.get_snapshot()))
+
+    def is_game_over(self):
+        if self.state.who_wins is None and (winner_message := self.state.get_winner_message()):
+            self.apply_transition(GAME_WON_TRANSITION, who_wins=winner_message)
+            self.events.log(GAME_OVER_EVENT, who_wins=winner_message)
+        return self.state.who_wins is not None
+
+    def run_chat_round_between_players(self, players, chat_room):
+        for player in players:
+            self.write_chat_lines(chat_room, player.name, player.get_new_messages())
+
+    def get_remaining_phase_seconds(self, time_limit_seconds):
+        """Until the deadline of the current phase, which a restarted game manager keeps"""
+        if self.state.phase_ends_at is None:  # journaled without one
+            return time_limit_seconds
+        return max(0.0, self.state.phase_ends_at - time.time())
+
+    def get_phase_ends_at(self, time_limit_seconds):
+        return None if time_limit_seconds is None else time.time() + time_limit_seconds
+
+    async def relay_chat_until_deadline(self, players, chat_room, time_limit_seconds):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.get_remaining_phase_seconds(time_limit_seconds)
+        personal_chat_files = [player.personal_chat_file.name for player in players
+                               if player.inbox is None]
+        # the waiter is created before the first relay so no message written in between is missed
+        with self.get_input_waiter(personal_chat_files) as waiter:
+            self.run_chat_round_between_players(players, chat_room)
+            while (remaining_seconds := deadline - loop.time()) > 0:
+                if await self.wait_for_input(waiter, remaining_seconds):
+                    self.run_chat_round_between_players(players, chat_room)
+
+    def notify_players_about_voting_time(self, phase_name, public_chat_file, **fields):
+        phase_end_message = DAYTIME_VOTING_TIME_MESSAGE if phase_name == DAYTIME \
+            else NIGHTTIME_VOTING_TIME_MESSAGE
+        # only to the current phase's active players chat room
+        self.write_manager_message(public_chat_file, phase_end_message)
+        self.apply_transition(PHASE_CHANGED_TRANSITION, phase=DAYTIME_VOTING_TIME
+                              if phase_name == DAYTIME else NIGHTTIME_VOTING_TIME, **fields)
+
+    async def voting_sub_phase(self, phase_name, voting_players, optional_votes_players,
+                               public_chat_file):
+        voting_minutes = self.config.get(VOTING_MINUTES_KEY, DEFAULT_VOTING_MINUTES)
+        time_limit_seconds = None if voting_minutes is None \
+            else self.clock.to_real_seconds(minutes_to_seconds(voting_minutes))
+        is_resumed = self.state.phase != phase_name  # restarted after the voting had started
+        if not is_resumed:
+            # votes written after previous voting closed aren't meant for this one
+            vote_file_offsets = {player.name: player.skip_pending_votes()
+                                 for player in voting_players}
+            self.notify_players_about_voting_time(
+                phase_name, public_chat_file, ends_at=self.get_phase_ends_at(time_limit_seconds),
+                vote_file_offsets=vote_file_offsets)
+        vote_collector = VoteCollector(self, voting_players, optional_votes_players,
+                                       public_chat_file)
+        if is_resumed:
+            for player in vote_collector.missing_voters:
+                if player.name in self.state.vote_file_offsets:
+                    player.resume_votes_from(self.state.vote_file_offsets[player.name])
+                else:  # journaled without them
+                    player.skip_pending_votes()
+        voted_out_name = await vote_collector.get_voted_out_name(
+            None if time_limit_seconds is None
+            else self.get_remaining_phase_seconds(time_limit_seconds),
+            self.config.get(STOP_VOTING_EARLY_KEY, DEFAULT_STOP_VOTING_EARLY))
+        self.apply_transition(PLAYER_ELIMINATED_TRANSITION, name=voted_out_name)
+        self.events.log(VOTED_OUT_EVENT, name=voted_out_name,
+                        is_mafia=self.all_players[voted_out_name].is_mafia)
+        self.announce_voted_out_player(self.all_players[voted_out_name])
+
+    def announce_voted_out_player(self, voted_out_player):
+        role = get_role_string(voted_out_player.is_mafia)
+        voted_out_message = VOTED_OUT_MESSAGE_FORMAT.format(voted_out_player.name, role)
+        self.game_manager_announcement(voted_out_message)
+
+    async def run_phase(self, voting_players, optional_votes_players, public_chat_file,
+                        time_limit_seconds, phase_name):
+        if self.state.phase == phase_name:  # otherwise it was restarted after voting had started
+            if len(voting_players) > 1:
+                await self.relay_chat_until_deadline(voting_players, public_chat_file,
+                                                     time_limit_seconds)
+            else:
+                self.game_manager_announcement(CUTTING_TO_VOTE_MESSAGE)
+            self.print_to_operator("Now voting starts...")
+        await self.voting_sub_phase(phase_name, voting_players, optional_votes_players,
+                                    public_chat_file)
+        self.events.log(PHASE_END_EVENT, phase=phase_name)
+
+    def is_resuming_phase(self, phase_name):
+        # after a restart in the middle of the phase, which continues from where it was
+        return self.state.phase is not None and self.state.phase.startswith(phase_name) and \
+            not self.state.is_phase_over
+
+    async def run_nighttime(self):
+        nighttime_minutes = self.config[NIGHTTIME_MINUTES_KEY]
+        time_limit_seconds = self.clock.to_real_seconds(minutes_to_seconds(nighttime_minutes))
+        if not self.is_resuming_phase(NIGHTTIME):
+            self.apply_transition(PHASE_CHANGED_TRANSITION, phase=NIGHTTIME,
+                                  ends_at=self.get_phase_ends_at(time_limit_seconds))
+            self.events.log(PHASE_START_EVENT, phase=NIGHTTIME, minutes=nighttime_minutes)
+            self.print_to_operator(NIGHTTIME_START_MESSAGE_FORMAT.format(nighttime_minutes),
+                                   NIGHTTIME_COLOR)
+            self.game_manager_announcement(
+                NIGHTTIME_START_MESSAGE_FORMAT.format(nighttime_minutes))
+        mafia_players = [player for player in self.players if player.is_mafia]
+        bystanders = [player for player in self.players if not player.is_mafia]
+        await self.run_phase(mafia_players, bystanders, self.game_dir / PUBLIC_NIGHTTIME_CHAT_FILE,
+                             time_limit_seconds, NIGHTTIME)
+
+    async def run_daytime(self):
+        daytime_minutes = self.config[DAYTIME_MINUTES_KEY]
+        time_limit_seconds = self.clock.to_real_seconds(minutes_to_seconds(daytime_minutes))
+        if not self.is_resuming_phase(DAYTIME):
+            self.apply_transition(PHASE_CHANGED_TRANSITION, phase=DAYTIME,
+                                  ends_at=self.get_phase_ends_at(time_limit_seconds))
+            self.events.log(PHASE_START_EVENT, phase=DAYTIME, minutes=daytime_minutes)
+            self.print_to_operator(DAYTIME_START_MESSAGE_FORMAT.format(daytime_minutes),
+                                   DAYTIME_COLOR)
+            self.game_manager_announcement(DAYTIME_START_MESSAGE_FORMAT.format(daytime_minutes))
+        await self.run_phase(self.players, self.players, self.game_dir / PUBLIC_DAYTIME_CHAT_FILE,
+                             time_limit_seconds, DAYTIME)
+
+    async def wait_for_players(self):
+        join_barrier = JoinBarrier(self.game_dir)
+        self.print_to_operator("Waiting for all players to connect and start running their "
+                               "programs to join:")
+        self.print_to_operator(",  ".join(join_barrier.get_missing_players()))
+        join_timeout_minutes = self.config.get(JOIN_TIMEOUT_MINUTES_KEY)
+        if join_timeout_minutes is None:
+            join_timeout_minutes = self.default_join_timeout_minutes
+        loop = asyncio.get_running_loop()
+        deadline = None if join_timeout_minutes is None \
+            else loop.time() + minutes_to_seconds(join_timeout_minutes)
+        while True:
+            timeout = MISSING_PLAYERS_REPORT_INTERVAL_SECONDS if deadline is None \
+                else min(MISSING_PLAYERS_REPORT_INTERVAL_SECONDS, deadline - loop.time())
+            missing_players = await join_barrier.wait_for_all_players(
+                timeout, on_join=lambda name: self.print_to_operator(f"{name} has joined!"))
+            if not missing_players:
+                break
+            self.print_to_operator("Still waiting for: " + ",  ".join(missing_players))
+            if deadline is not None and loop.time() >= deadline:
+                return False
+        self.apply_transition(GAME_STARTED_TRANSITION, start_time=get_current_timestamp())
+        self.print_to_operator("Game is now running! Its content is displayed to players.")
+        return True
+
+    def resume_from_journal(self):
+        self.update_derived_files()  # in case it crashed between journaling and updating them
+        for player in self.players:
+            # messages written while the game manager was down can't be relayed in order anymore,
+            # while the votes of a voting that was in progress are read again (and the journaled
+            # ones replayed) when it continues
+            player.skip_pending_messages()
+        self.print_to_operator(f"Recovered the game from its journal, it was at {self.state.phase}")
+
+    def is_next_phase_nighttime(self):
+        # a recovered game continues with the phase it was in, unless someone was voted out in it
+        if self.state.phase is None:
+            return False
+        return self.state.phase.startswith(NIGHTTIME) != self.state.is_phase_over
+
+    def get_all_player_out_of_voting_time(self):
+        self.apply_transition(PHASE_CHANGED_TRANSITION,
+                              phase=self.state.phase.replace(VOTING_TIME, ""))
+
+    def close_game_files(self):
+        self.journal.close()
+        if self.chat_bus is not None:
+            self.chat_bus.close()
+        close_game_file_writer(self.game_dir)
+
+    def end_game(self):
+        self.get_all_player_out_of_voting_time()
+        self.close_game_files()
+        self.print_to_operator("Game has finished.")
+
+    async def run(self):
+        try:
+            await self._run()
+        finally:
+            # also when it crashed or was cancelled, so another game manager can run it
+            self.lock_file.close()
+
+    async def _run(self):
+        if self.state.is_cancelled:
+            self.close_game_files()
+            self.print_to_operator("This game was cancelled, so it can't run anymore.",
+                                   NIGHTTIME_COLOR)
+            return
+        if self.state.start_time is not None:
+            self.resume_from_journal()
+        elif not await self.wait_for_players():
+            # recorded, so the game isn't started again (e.g. by the orchestrator)
+            self.apply_transition(GAME_CANCELLED_TRANSITION)
+            self.close_game_files()
+            self.print_to_operator("Not all players joined in time, so the game was cancelled.",
+                                   NIGHTTIME_COLOR)
+            return
+        if self.is_next_phase_nighttime() and not self.is_game_over():
+            await self.run_nighttime()
+        while not self.is_game_over():
+            await self.run_daytime()
+            if self.is_game_over():
+                break
+            await self.run_nighttime()
+        self.end_game()
 
 
 def main():
-    global game_dir
     game_dir = get_game_dir_from_argv()
-    config = get_config()
-    players = get_players(config)
-    wait_for_players(players)
-    while not is_game_over(players):
-        run_daytime(players, config[DAYTIME_MINUTES_KEY])
-        if is_game_over(players):
-            break
-        run_nighttime(players, config[NIGHTTIME_MINUTES_KEY])
-    end_game()
+    try:
+        game = Game(game_dir)
+    except GameAlreadyRunningError as error:
+        print(colored(str(error), NIGHTTIME_COLOR))
+        return
+    asyncio.run(game.run())
 
 
 if __name__ == '__main__':
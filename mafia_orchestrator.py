@@ -0,0 +1,110 @@
+import json
+import asyncio
+from game_constants import *  # incl. argparse, time, Path (from pathlib), colored (from termcolor)
+from mafia_main import Game, GameAlreadyRunningError
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Runs the game manager of many games concurrently in a single process "
+                    "(instead of running mafia_main.py for each game)")
+    parser.add_argument("game_ids", nargs="*", help=f"{GAME_ID_NUM_DIGITS}-digit game IDs")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help=f"keep running, and also start every new game that is prepared "
+                             f"in {DIRS_PREFIX} (checked every {GAMES_SCAN_INTERVAL_SECONDS} "
+                             f"seconds)")
+    parser.add_argument("-jt", "--join-timeout", type=float,
+                        default=DEFAULT_WATCHED_GAMES_JOIN_TIMEOUT_MINUTES,
+                        help=f"minutes that the games found by -w/--watch wait for their players "
+                             f"to join before they are cancelled, unless their config sets it "
+                             f"(default: {DEFAULT_WATCHED_GAMES_JOIN_TIMEOUT_MINUTES})")
+    args = parser.parse_args()
+    if not args.game_ids and not args.watch:
+        parser.error("provide game IDs to run and/or use -w/--watch")
+    return args
+
+
+def get_game_dir(game_id):
+    game_dir = Path(DIRS_PREFIX) / game_id
+    if not (game_dir / GAME_CONFIG_FILE).exists():
+        raise ValueError(f"The provided game ID {game_id} doesn't belong to a configured game")
+    return game_dir
+
+
+def is_cancelled(game_dir):
+    try:
+        return json.loads((game_dir / GAME_STATUS_FILE).read_text())[STATUS_IS_CANCELLED_KEY]
+    except (FileNotFoundError, ValueError, KeyError):  # not started yet, or from before cancelling
+        return False
+
+
+def is_waiting_to_start(game_dir):
+    # prepared with prepare_game.py, and its manager didn't start running it yet (nor cancelled it)
+    start_time_file = game_dir / GAME_START_TIME_FILE
+    return (game_dir / GAME_CONFIG_FILE).exists() and start_time_file.exists() \
+        and not start_time_file.read_text() and not is_cancelled(game_dir)
+
+
+class GamesOrchestrator:
+    """
+    Hosts many concurrent games in one event loop, each one as its own asyncio task, so a failure
+    in one game (including in loading it) doesn't stop the others.
+    """
+
+    def __init__(self,
+                 watched_games_join_timeout_minutes=DEFAULT_WATCHED_GAMES_JOIN_TIMEOUT_MINUTES):
+        self.running_games = {}  # game ID -> task
+        self.skipped_games = set()  # crashed or run by another game manager, not started again
+        self.watched_games_join_timeout_minutes = watched_games_join_timeout_minutes
+
+    async def run_game(self, game_id, join_timeout_minutes):
+        try:
+            game = Game(get_game_dir(game_id), operator_prefix=f"[game {game_id}] ",
+                        default_join_timeout_minutes=join_timeout_minutes)
+        except GameAlreadyRunningError:
+            self.skipped_games.add(game_id)
+            print(colored(f"Game {game_id} is already run by another game manager, skipping it",
+                          MANAGER_COLOR))
+            return
+        await game.run()
+
+    def start_game(self, game_id, join_timeout_minutes=DEFAULT_JOIN_TIMEOUT_MINUTES):
+        if game_id in self.running_games:
+            return
+        task = asyncio.create_task(self.run_game(game_id, join_timeout_minutes),
+                                   name=f"game {game_id}")
+        task.add_done_callback(lambda done_task: self.on_game_done(game_id, done_task))
+        self.running_games[game_id] = task
+        print(colored(f"Started running game {game_id}", MANAGER_COLOR))
+
+    def on_game_done(self, game_id, task):
+        del self.running_games[game_id]
+        if not task.cancelled() and task.exception() is not None:
+            self.skipped_games.add(game_id)
+            print(colored(f"Game {game_id} has crashed: {task.exception()!r}", NIGHTTIME_COLOR))
+        print(colored(f"Game {game_id} is done, {len(self.running_games)} games are still "
+                      f"running", MANAGER_COLOR))
+
+    def start_new_prepared_games(self):
+        for game_dir in sorted(Path(DIRS_PREFIX).iterdir()):
+            if game_dir.name not in self.running_games and \
+                    game_dir.name not in self.skipped_games and is_waiting_to_start(game_dir):
+                # games that nobody joins (e.g. prepared and then abandoned) don't wait forever
+                self.start_game(game_dir.name, self.watched_games_join_timeout_minutes)
+
+    async def run(self, game_ids, watch):
+        for game_id in game_ids:
+            self.start_game(game_id)
+        while watch:
+            self.start_new_prepared_games()
+            await asyncio.sleep(GAMES_SCAN_INTERVAL_SECONDS)
+        await asyncio.gather(*self.running_games.values(), return_exceptions=True)
+
+
+def main():
+    args = parse_args()
+    asyncio.run(GamesOrchestrator(args.join_timeout).run(args.game_ids, args.watch))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,20 +14,25 @@ from pathlib import Path
 from typing import Dict, List
 import uvicorn
 import time
+import os
 
 import threading
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+from collections import deque, OrderedDict
 
 # Import your existing game modules
 # Note: You'll need to make sure these imports work with your file structure
 try:
     from game_constants import *
-    from game_status_checks import (
-        is_game_over, is_time_to_vote, all_players_joined,
-        get_is_mafia, is_nighttime, is_voted_out
-    )
     from player_survey import run_survey_about_llm_player
+    from game_io import get_game_file_writer, close_game_file_writer, AsyncGameStorage
+    from session_store import get_session_store
+    from game_status_checks import read_status_snapshot
+    from file_watcher import FileChangeWaiter, wait_for_changes_or_event
+    from tail_reader import TailReader
+    from chat_bus import ChatBusReader
+    from mafia_main import Game, PlayerInbox, GameAlreadyRunningError
 except ImportError:
     print("Warning: Could not import game modules. Make sure they are in the same directory.")
 
@@ -43,81 +48,153 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Thread-safe storage for concurrent player access
 _data_lock = threading.RLock()  # Reentrant lock for nested access
 
-# Store active WebSocket connections for real-time chat
-# Format: {game_id: {player_name: websocket}}
-active_connections: Dict[str, Dict[str, WebSocket]] = {}
+# Store player sessions and track votes to prevent multiple votes per round, in memory or (when
+# the server runs several workers) in a database they all share
+# Session format: {game_id, character_name, is_mafia, real_name}
+session_store = get_session_store()
+session_store_executor = ThreadPoolExecutor(SESSION_STORE_MAX_THREADS, thread_name_prefix="session-store")
 
-# Store player sessions
-# Format: {session_id: {game_id, player_name, is_mafia, real_name}}
-player_sessions: Dict[str, Dict] = {}
 
-# Track votes to prevent multiple votes per round
-# Format: {game_id: {player_name: {round_number: [list_of_votes]}}}
-player_vote_tracking: Dict[str, Dict[str, Dict[int, List[str]]]] = {}
+class PlayerConnection:
+    """
+    A player's WebSocket with a bounded queue of outgoing messages, which its own writer task sends.
+    Queueing a message never waits for the browser, so a slow player doesn't delay the others.
+    When the queue is full, stale status updates are dropped first; if there are none, the player
+    is too slow and is disconnected (their client then reconnects and resumes from its cursors).
+    """
+
+    def __init__(self, websocket: WebSocket, game_id: str, player_name: str, is_mafia: bool):
+        self.websocket = websocket
+        self.game_id = game_id
+        self.player_name = player_name
+        self.is_mafia = is_mafia
+        self._outgoing = deque()  # (coalesce key or None, message)
+        self._has_outgoing = asyncio.Event()
+        self._writer_task = asyncio.create_task(self._run_writer())
+        self._writer_task.add_done_callback(self._on_writer_done)
+
+    def send(self, message: str, coalesce_key: str = None):
+        """
+        Queue a message. A message with a coalesce key replaces the queued message with the same key,
+        for status updates of which only the latest matters.
+        """
+        if self._writer_task.done():
+            return  # closed
+        if coalesce_key is not None:
+            for entry in self._outgoing:
+                if entry[0] == coalesce_key:
+                    self._outgoing.remove(entry)
+                    break
+        if len(self._outgoing) >= SEND_QUEUE_MAX_MESSAGES:
+            stale_entry = next((entry for entry in self._outgoing if entry[0] is not None), None)
+            if stale_entry is None:
+                print(f"Player {self.player_name} of game {self.game_id} is too slow, disconnecting")
+                self.close(code=1013)  # try again later
+                return
+            self._outgoing.remove(stale_entry)
+        self._outgoing.append((coalesce_key, message))
+        self._has_outgoing.set()
+
+    async def _run_writer(self):
+        while True:
+            if not self._outgoing:
+                self._has_outgoing.clear()
+                await self._has_outgoing.wait()
+                continue
+            _, message = self._outgoing.popleft()
+            await self.websocket.send_text(message)
+
+    def _on_writer_done(self, writer_task: asyncio.Task):
+        if not writer_task.cancelled() and writer_task.exception() is not None:
+            # e.g. the WebSocket broke while sending, and `close` won't close it once the writer is done
+            print(f"Error sending to player {self.player_name} of game {self.game_id}: "
+                  f"{writer_task.exception()!r}")
+            asyncio.create_task(self._close_websocket(code=1011))  # internal error
+        manager.disconnect(self.game_id, self.player_name, self)
+
+    def close(self, code: int = 1000):
+        """Stop sending, and close the WebSocket if it's still open"""
+        if self._writer_task.done():
+            return
+        self._writer_task.cancel()
+        asyncio.create_task(self._close_websocket(code))
+
+    async def _close_websocket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # already closed by the client
 
 
 class ConnectionManager:
     """
-    Thread-safe WebSocket connection manager for multiple concurrent players.
-    Each player gets their own connection while sharing the same server instance.
+    WebSocket connection manager for multiple concurrent players.
+    Runs only on the event loop (so it needs no locks), and sending only queues the message on each
+    recipient's connection, so broadcasting costs O(1) per player and never waits for the slowest one.
     """
 
     def __init__(self):
         # Store connections by game_id and player_name
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
-        self._lock = threading.RLock()
+        self.active_connections: Dict[str, Dict[str, PlayerConnection]] = {}
 
-    async def connect(self, websocket: WebSocket, game_id: str, player_name: str):
+    async def connect(self, websocket: WebSocket, game_id: str, player_name: str,
+                      is_mafia: bool = False) -> PlayerConnection:
         """Accept a new WebSocket connection and add it to the game room"""
         await websocket.accept()
 
-        with self._lock:
-            if game_id not in self.active_connections:
-                self.active_connections[game_id] = {}
-
-            self.active_connections[game_id][player_name] = websocket
-            print(f"[Thread {threading.current_thread().ident}] Player {player_name} connected to game {game_id}")
-
-    def disconnect(self, game_id: str, player_name: str):
-        """Remove a WebSocket connection"""
-        with self._lock:
-            if game_id in self.active_connections:
-                if player_name in self.active_connections[game_id]:
-                    del self.active_connections[game_id][player_name]
-                    print(f"[Thread {threading.current_thread().ident}] Player {player_name} disconnected from game {game_id}")
-
-    async def send_personal_message(self, message: str, game_id: str, player_name: str):
+        game_connections = self.active_connections.setdefault(game_id, {})
+        previous_connection = game_connections.get(player_name)
+        if previous_connection is not None:
+            # the same player connected again, e.g. from a new tab, so the older tab is told it was
+            # replaced by a newer connection, and doesn't reconnect
+            previous_connection.close(code=4002)
+        connection = game_connections[player_name] = PlayerConnection(websocket, game_id, player_name, is_mafia)
+        print(f"Player {player_name} connected to game {game_id}")
+        return connection
+
+    def is_connected(self, game_id: str, player_name: str) -> bool:
+        return player_name in self.active_connections.get(game_id, {})
+
+    def disconnect(self, game_id: str, player_name: str, connection: PlayerConnection = None):
+        """Remove a WebSocket connection (only if it's still the given one, when given)"""
+        game_connections = self.active_connections.get(game_id, {})
+        current_connection = game_connections.get(player_name)
+        if current_connection is None or (connection is not None and current_connection is not connection):
+            return
+        del game_connections[player_name]
+        if not game_connections:
+            del self.active_connections[game_id]
+        current_connection.close()
+        print(f"Player {player_name} disconnected from game {game_id}")
+
+    def get_players(self, game_id: str) -> Dict[str, bool]:
+        """Get the connected players of a game, and whether each one is mafia"""
+        return {player_name: connection.is_mafia
+                for player_name, connection in self.active_connections.get(game_id, {}).items()}
+
+    async def send_personal_message(self, message: str, game_id: str, player_name: str,
+                                    coalesce_key: str = None):
         """Send a message to a specific player"""
-        with self._lock:
-            if (game_id in self.active_connections and
-                player_name in self.active_connections[game_id]):
-                websocket = self.active_connections[game_id][player_name]
-                try:
-                    await websocket.send_text(message)
-                except:
-                    # Connection might be closed, remove it
-                    self.disconnect(game_id, player_name)
-
-    async def broadcast_to_game(self, message: str, game_id: str, exclude_player: str = None):
-        """Send a message to all players in a game (optionally excluding one player)"""
-        connections_copy = {}
-
-        with self._lock:
-            if game_id in self.active_connections:
-                connections_copy = self.active_connections[game_id].copy()
-
-        for player_name, websocket in connections_copy.items():
+        connection = self.active_connections.get(game_id, {}).get(player_name)
+        if connection is not None:
+            connection.send(message, coalesce_key)
+
+    async def broadcast_to_game(self, message: str, game_id: str, exclude_player: str = None,
+                                only_mafia: bool = False, coalesce_key: str = None):
+        """Send a message to all players in a game (optionally excluding one player, or only to mafia)"""
+        for player_name, connection in list(self.active_connections.get(game_id, {}).items()):
             if exclude_player and player_name == exclude_player:
                 continue
-            try:
-                await websocket.send_text(message)
-            except:
-                # Connection might be closed, remove it
-                self.disconnect(game_id, player_name)
+            if only_mafia and not connection.is_mafia:
+                continue
+            connection.send(message, coalesce_key)
 
 # Create connection manager instance
 manager = ConnectionManager()
 
+# Runs the blocking file work of the handlers off the event loop, in order per game
+storage = AsyncGameStorage()
+
 
 def validate_game_exists(game_id: str) -> bool:
     """
@@ -136,17 +213,158 @@ def get_game_directory(game_id: str) -> Path:
     return Path("games") / game_id  # Adjust path as needed
 
 
+class GameMetadataCache:
+    """
+    In-memory copy of the game files that the request handlers look up (names, roles, statuses).
+    `refresh` (run off the event loop) reads again only the files that the game dir's file watcher
+    noticed changing since the previous refresh, so the lookups that follow are served from memory.
+    The game's status comes from its snapshot once the game manager publishes it, which is parsed
+    again only when its version changed.
+    """
+
+    def __init__(self, game_dir: Path):
+        self.game_dir = game_dir
+        player_names = (game_dir / PLAYER_NAMES_FILE).read_text().splitlines()
+        personal_files = [file_format.format(name) for name in player_names
+                          for file_format in (PERSONAL_STATUS_FILE_FORMAT, LLM_LOG_FILE_FORMAT)]
+        self.waiter = FileChangeWaiter(game_dir, [
+            REAL_NAMES_FILE, PLAYER_NAMES_FILE, MAFIA_NAMES_FILE, REMAINING_PLAYERS_FILE,
+            PHASE_STATUS_FILE, WHO_WINS_FILE, GAME_START_TIME_FILE, GAME_STATUS_FILE] + personal_files)
+        self._contents = {}  # file name -> parsed content (None if the file doesn't exist)
+        self._existence = {}  # file name -> whether it exists
+        self._changes = {}  # file name -> number of changes noticed, so a read from before one isn't kept
+        self._last_drain_time = 0
+        self._lock = threading.Lock()  # not held while reading, so lookups never wait for the disk
+        self._snapshot = None  # replaced as a whole by `refresh`, so lookups see a consistent status
+
+    def refresh(self) -> "GameMetadataCache":
+        """Read the files that changed since the previous refresh (blocking, so not on the event loop)"""
+        # without inotify, draining stats every file, so it's done at most once per polling interval
+        changed_files = set()
+        if self.waiter.uses_inotify or \
+                time.monotonic() - self._last_drain_time >= STAT_POLLING_INTERVAL_SECONDS:
+            self._last_drain_time = time.monotonic()
+            changed_files = self.waiter.drain_changes()
+            with self._lock:
+                for file_name in changed_files:
+                    self._contents.pop(file_name, None)
+                    self._existence.pop(file_name, None)
+                    self._changes[file_name] = self._changes.get(file_name, 0) + 1
+        if self._snapshot is None or GAME_STATUS_FILE in changed_files:
+            self._snapshot = read_status_snapshot(self.game_dir / GAME_STATUS_FILE, self._snapshot)
+        for character_name in self.get_player_names():
+            self.get_personal_status(character_name)
+        self.get_real_names_to_codenames()
+        self.get_remaining_players()
+        self.get_is_mafia("")
+        self.is_nighttime()
+        self.is_game_over()
+        self.all_players_joined()
+        self.is_cancelled()
+        self.get_llm_player_name()
+        return self
+
+    def _load(self, cache: Dict, file_name: str, load):
+        with self._lock:
+            if file_name in cache:
+                return cache[file_name]
+            num_changes = self._changes.get(file_name, 0)
+        value = load(self.game_dir / file_name)
+        with self._lock:
+            if self._changes.get(file_name, 0) == num_changes:
+                cache[file_name] = value
+        return value
+
+    def _read(self, file_name: str, parse=str.splitlines):
+        return self._load(self._contents, file_name,
+                          lambda path: parse(path.read_text()) if path.exists() else None)
+
+    def _exists(self, file_name: str) -> bool:
+        return self._load(self._existence, file_name, Path.exists)
+
+    def get_player_names(self) -> List[str]:
+        return self._read(PLAYER_NAMES_FILE) or []
+
+    def get_real_names_to_codenames(self) -> Dict[str, str]:
+        return self._read(REAL_NAMES_FILE, lambda text: dict(
+            real_to_code.split(REAL_NAME_CODENAME_DELIMITER) for real_to_code in text.splitlines()
+        )) or {}
+
+    def _get_status(self, key: str, file_name: str, parse=str):
+        # the status files are read only until the game manager publishes the snapshot
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot.get(key)
+        return self._read(file_name, parse)
+
+    def get_remaining_players(self) -> List[str]:
+        return self._get_status(STATUS_REMAINING_PLAYERS_KEY, REMAINING_PLAYERS_FILE, str.splitlines) or []
+
+    def get_is_mafia(self, character_name: str) -> bool:
+        return character_name in (self._read(MAFIA_NAMES_FILE, lambda text: set(text.splitlines())) or ())
+
+    def get_personal_status(self, character_name: str) -> str:
+        return self._read(PERSONAL_STATUS_FILE_FORMAT.format(character_name), str) or ""
+
+    def is_voted_out(self, character_name: str) -> bool:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return character_name in snapshot[STATUS_ELIMINATED_PLAYERS_KEY]
+        return VOTED_OUT in self.get_personal_status(character_name)
+
+    def is_nighttime(self) -> bool:
+        return NIGHTTIME in (self._get_status(STATUS_PHASE_KEY, PHASE_STATUS_FILE) or "")
+
+    def is_time_to_vote(self) -> bool:
+        return VOTING_TIME in (self._get_status(STATUS_PHASE_KEY, PHASE_STATUS_FILE) or "")
+
+    def is_game_over(self) -> bool:
+        # if someone wins, it isn't empty
+        return bool(self._get_status(STATUS_WHO_WINS_KEY, WHO_WINS_FILE))
+
+    def all_players_joined(self) -> bool:
+        # the manager sets the start time once all players joined
+        return bool(self._get_status(STATUS_START_TIME_KEY, GAME_START_TIME_FILE))
+
+    def is_cancelled(self) -> bool:
+        # the manager cancels the game if not all players joined in time
+        return bool(self._snapshot and self._snapshot.get(STATUS_IS_CANCELLED_KEY))
+
+    def get_llm_player_name(self) -> str:
+        for player_name in self.get_player_names():
+            if self._exists(LLM_LOG_FILE_FORMAT.format(player_name)):
+                return player_name
+        return None
+
+
+# Format: {game_id: GameMetadataCache}
+game_metadata_caches: Dict[str, GameMetadataCache] = {}
+
+
+def get_game_metadata(game_id: str) -> GameMetadataCache:
+    """Get the metadata cache of a game, creating it on the first lookup"""
+    with _data_lock:
+        metadata = game_metadata_caches.get(game_id)
+        if metadata is None:
+            game_dir = get_game_directory(game_id)
+            if not game_dir.is_dir():
+                raise ValueError(f"Game {game_id} does not exist")
+            metadata = game_metadata_caches[game_id] = GameMetadataCache(game_dir)
+        return metadata
+
+
+async def load_game_metadata(game_id: str) -> GameMetadataCache:
+    """Get the metadata cache of a game, after refreshing it in the storage threads"""
+    return await storage.run(get_game_directory(game_id), lambda: get_game_metadata(game_id).refresh())
+
+
 def get_available_players(game_id: str) -> List[str]:
     """
     Get list of available player names for the game.
-    This reads from your existing PLAYER_NAMES_FILE.
+    This reads from your existing PLAYER_NAMES_FILE (through the game's metadata cache).
     """
     try:
-        game_dir = get_game_directory(game_id)
-        player_names_file = game_dir / PLAYER_NAMES_FILE
-        if player_names_file.exists():
-            return player_names_file.read_text().splitlines()
-        return []
+        return get_game_metadata(game_id).get_player_names()
     except:
         return []
 
@@ -157,21 +375,8 @@ def assign_character_name(game_id: str, real_name: str) -> str:
     This reads from the REAL_NAMES_FILE that maps real names to character names.
     """
     try:
-        game_dir = get_game_directory(game_id)
-        real_names_file = game_dir / REAL_NAMES_FILE
-
-        if not real_names_file.exists():
-            return None
-
-        # Extract the mapping as described by the user
-        real_names_to_codenames_str = real_names_file.read_text().splitlines()
-        real_names_to_codenames = dict([
-            real_to_code.split(REAL_NAME_CODENAME_DELIMITER)
-            for real_to_code in real_names_to_codenames_str
-        ])
-
         # Return the mapped character name for this real name
-        return real_names_to_codenames.get(real_name)
+        return get_game_metadata(game_id).get_real_names_to_codenames().get(real_name)
 
     except Exception as e:
         print(f"Error getting character name: {e}")
@@ -184,24 +389,12 @@ def get_available_real_names(game_id: str) -> List[str]:
     This reads from the REAL_NAMES_FILE to get all pre-registered players.
     """
     try:
-        game_dir = get_game_directory(game_id)
-        real_names_file = game_dir / REAL_NAMES_FILE
-
-        if not real_names_file.exists():
-            return []
-
-        # Extract the mapping
-        real_names_to_codenames_str = real_names_file.read_text().splitlines()
-        real_names_to_codenames = dict([
-            real_to_code.split(REAL_NAME_CODENAME_DELIMITER)
-            for real_to_code in real_names_to_codenames_str
-        ])
+        metadata = get_game_metadata(game_id)
 
         # Check which players haven't joined yet
         available_real_names = []
-        for real_name, character_name in real_names_to_codenames.items():
-            status_file = game_dir / PERSONAL_STATUS_FILE_FORMAT.format(character_name)
-            if not status_file.exists() or status_file.read_text().strip() != JOINED:
+        for real_name, character_name in metadata.get_real_names_to_codenames().items():
+            if metadata.get_personal_status(character_name).strip() != JOINED:
                 available_real_names.append(real_name)
 
         return available_real_names
@@ -217,13 +410,7 @@ def get_remaining_players_for_voting(game_id: str, current_player: str) -> List[
     This reads from REMAINING_PLAYERS_FILE and excludes the current player.
     """
     try:
-        game_dir = get_game_directory(game_id)
-        remaining_file = game_dir / REMAINING_PLAYERS_FILE
-
-        if not remaining_file.exists():
-            return []
-
-        remaining_players = remaining_file.read_text().splitlines()
+        remaining_players = get_game_metadata(game_id).get_remaining_players()
         # Remove current player (players can't vote for themselves)
         return [player for player in remaining_players if player != current_player]
 
@@ -237,60 +424,45 @@ def get_current_round(game_id: str) -> int:
     Calculate the current round number based on remaining players.
     """
     try:
-        game_dir = get_game_directory(game_id)
-        total_players = len((game_dir / PLAYER_NAMES_FILE).read_text().splitlines())
-        remaining_players = len((game_dir / REMAINING_PLAYERS_FILE).read_text().splitlines())
+        metadata = get_game_metadata(game_id)
+        total_players = len(metadata.get_player_names())
+        remaining_players = len(metadata.get_remaining_players())
+        if not remaining_players:
+            return 1
         return total_players - remaining_players + 1
     except:
         return 1
 
-def safe_get_session(session_id: str) -> Dict:
+async def run_session_store_query(function, *args):
+    """Run a session store query, on the session store's threads if it may wait for the database"""
+    if not session_store.queries_may_block:
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(session_store_executor, function, *args)
+
+async def safe_get_session(session_id: str) -> Dict:
     """Thread-safe session retrieval"""
-    with _data_lock:
-        return player_sessions.get(session_id, {}).copy()
+    return await run_session_store_query(session_store.get_session, session_id)
 
-def safe_set_session(session_id: str, session_data: Dict):
+async def safe_set_session(session_id: str, session_data: Dict):
     """Thread-safe session storage"""
-    with _data_lock:
-        player_sessions[session_id] = session_data.copy()
+    await run_session_store_query(session_store.set_session, session_id, session_data)
 
-def safe_has_player_voted(game_id: str, character_name: str, current_round: int) -> bool:
+async def safe_has_player_voted(game_id: str, character_name: str, current_round: int) -> bool:
     """Thread-safe vote checking"""
-    with _data_lock:
-        if game_id not in player_vote_tracking:
-            return False
-
-        if character_name not in player_vote_tracking[game_id]:
-            return False
+    return await safe_get_player_vote(game_id, character_name, current_round) is not None
 
-        if current_round not in player_vote_tracking[game_id][character_name]:
-            return False
+async def safe_record_vote(game_id: str, character_name: str, current_round: int, voted_player: str) -> bool:
+    """Thread-safe vote recording, returns False if the player already voted this round"""
+    return await run_session_store_query(
+        session_store.record_vote, game_id, character_name, current_round, voted_player)
 
-        return len(player_vote_tracking[game_id][character_name][current_round]) > 0
+async def safe_get_player_vote(game_id: str, character_name: str, current_round: int) -> str:
+    """Thread-safe vote retrieval, None if the player didn't vote this round"""
+    return await run_session_store_query(session_store.get_vote, game_id, character_name, current_round)
 
-def safe_record_vote(game_id: str, character_name: str, current_round: int, voted_player: str):
-    """Thread-safe vote recording"""
-    with _data_lock:
-        if game_id not in player_vote_tracking:
-            player_vote_tracking[game_id] = {}
-
-        if character_name not in player_vote_tracking[game_id]:
-            player_vote_tracking[game_id][character_name] = {}
-
-        if current_round not in player_vote_tracking[game_id][character_name]:
-            player_vote_tracking[game_id][character_name][current_round] = []
-
-        player_vote_tracking[game_id][character_name][current_round].append(voted_player)
-
-def safe_get_player_vote(game_id: str, character_name: str, current_round: int) -> str:
-    """Thread-safe vote retrieval"""
-    with _data_lock:
-        if (game_id in player_vote_tracking and
-            character_name in player_vote_tracking[game_id] and
-            current_round in player_vote_tracking[game_id][character_name] and
-            len(player_vote_tracking[game_id][character_name][current_round]) > 0):
-            return player_vote_tracking[game_id][character_name][current_round][0]
-        return None
+async def safe_delete_votes(game_id: str):
+    """Thread-safe deletion of the votes of a game that ended"""
+    await run_session_store_query(session_store.delete_votes, game_id)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -326,6 +498,7 @@ async def select_name_page(request: Request, game_id: str):
     if not validate_game_exists(game_id):
         raise HTTPException(status_code=404, detail="Game not found")
 
+    await load_game_metadata(game_id)
     available_names = get_available_real_names(game_id)
 
     return templates.TemplateResponse(
@@ -354,6 +527,8 @@ async def assign_character(request: Request, game_id: str, real_name: str = Form
         )
 
     # Assign character name
+    await load_game_metadata(game_id)
+    start_embedded_game(game_id)
     character_name = assign_character_name(game_id, real_name.strip())
 
     if not character_name:
@@ -368,7 +543,7 @@ async def assign_character(request: Request, game_id: str, real_name: str = Form
 
     # Get player role (mafia or not)
     game_dir = get_game_directory(game_id)
-    is_mafia = get_is_mafia(character_name, game_dir)
+    is_mafia = get_game_metadata(game_id).get_is_mafia(character_name)
 
     # Store session information in thread-safe manner
     session_data = {
@@ -378,12 +553,12 @@ async def assign_character(request: Request, game_id: str, real_name: str = Form
         "is_mafia": is_mafia,
         "thread_id": threading.current_thread().ident
     }
-    safe_set_session(session_id, session_data)
+    await safe_set_session(session_id, session_data)
 
     # Mark player as joined (integrating with existing game logic)
     try:
         status_file = game_dir / PERSONAL_STATUS_FILE_FORMAT.format(character_name)
-        status_file.write_text(JOINED)
+        await storage.run(game_dir, status_file.write_text, JOINED)
         print(f"[Thread {threading.current_thread().ident}] Player {character_name} joined game {game_id}")
     except Exception as e:
         print(f"Error marking player as joined: {e}")
@@ -402,10 +577,10 @@ async def game_interface(request: Request, game_id: str):
     """
     # Get session information
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    session = await safe_get_session(session_id) if session_id else {}
+    if not session:
         return RedirectResponse(url="/")
 
-    session = player_sessions[session_id]
     if session["game_id"] != game_id:
         return RedirectResponse(url="/")
 
@@ -421,6 +596,20 @@ async def game_interface(request: Request, game_id: str):
     )
 
 
+def parse_cursors(cursors_param: str) -> Dict[str, int]:
+    """
+    Parse the chat cursors a reconnecting client sends, as JSON of stream -> index of the next message.
+    Returns None when the client connects for the first time (or sent something invalid).
+    """
+    if not cursors_param:
+        return None
+    try:
+        cursors = json.loads(cursors_param)
+        return {str(stream): int(index) for stream, index in cursors.items()}
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
 @app.websocket("/ws/{game_id}")
 async def websocket_endpoint(websocket: WebSocket, game_id: str):
     """
@@ -435,7 +624,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str):
         await websocket.close(code=4001)
         return
 
-    session = safe_get_session(session_id)
+    session = await safe_get_session(session_id)
     if not session:
         await websocket.close(code=4001)
         return
@@ -446,16 +635,14 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str):
 
     print(f"[Thread {thread_id}] Starting WebSocket for {character_name} in game {game_id}")
 
-    await manager.connect(websocket, game_id, character_name)
-
+    connection = None
     try:
-        # Send initial game state
-        await send_game_state(websocket, game_id, character_name, is_mafia)
+        await load_game_metadata(game_id)
+        start_embedded_game(game_id)  # e.g. after the server was restarted in the middle of the game
 
-        # Start background task to monitor game files for this player
-        monitor_task = asyncio.create_task(
-            monitor_game_files(websocket, game_id, character_name, is_mafia)
-        )
+        # Join the game's shared file watcher, which sends the initial game state and then the updates
+        connection = await get_game_watcher(game_id).subscribe(
+            websocket, character_name, is_mafia, parse_cursors(query_params.get("cursors")))
 
         # Listen for messages from this player's client
         while True:
@@ -467,217 +654,401 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str):
 
     except WebSocketDisconnect:
         print(f"[Thread {thread_id}] Player {character_name} disconnected from game {game_id}")
-        manager.disconnect(game_id, character_name)
-        monitor_task.cancel()
     except Exception as e:
         print(f"[Thread {thread_id}] WebSocket error for {character_name}: {e}")
-        manager.disconnect(game_id, character_name)
-        if 'monitor_task' in locals():
-            monitor_task.cancel()
+    finally:
+        if connection is not None:
+            manager.disconnect(game_id, character_name, connection)
+        release_game_watcher(game_id, character_name)
 
 
-async def send_game_state(websocket: WebSocket, game_id: str, character_name: str, is_mafia: bool):
-    """Send current game state to the player"""
+def send_game_state(connection: PlayerConnection, character_name: str, is_mafia: bool):
+    """Send the player's role information"""
     try:
-        game_dir = get_game_directory(game_id)
-
-        # Send role information
         role = "Mafia" if is_mafia else "Bystander"
         role_color = "red" if is_mafia else "blue"
 
-        await websocket.send_text(json.dumps({
+        connection.send(json.dumps({
             "type": "role_info",
             "role": role,
             "color": role_color,
             "character_name": character_name
         }))
-
-        # Send existing chat messages
-        await send_existing_messages(websocket, game_dir, is_mafia)
-
     except Exception as e:
         print(f"Error sending game state: {e}")
 
 
-async def send_existing_messages(websocket: WebSocket, game_dir: Path, is_mafia: bool):
-    """Send existing chat messages to the player"""
-    try:
-        # Send manager messages
-        manager_file = game_dir / PUBLIC_MANAGER_CHAT_FILE
-        if manager_file.exists():
-            messages = manager_file.read_text().splitlines()
-            for message in messages:
-                await websocket.send_text(json.dumps({
-                    "type": "chat_message",
-                    "content": message,
-                    "color": "green"
-                }))
-
-        # Send daytime messages
-        daytime_file = game_dir / PUBLIC_DAYTIME_CHAT_FILE
-        if daytime_file.exists():
-            messages = daytime_file.read_text().splitlines()
-            for message in messages:
-                await websocket.send_text(json.dumps({
-                    "type": "chat_message",
-                    "content": message,
-                    "color": "blue"
-                }))
-
-        # Send nighttime messages (only for mafia)
-        if is_mafia:
-            nighttime_file = game_dir / PUBLIC_NIGHTTIME_CHAT_FILE
-            if nighttime_file.exists():
-                messages = nighttime_file.read_text().splitlines()
-                for message in messages:
-                    await websocket.send_text(json.dumps({
-                        "type": "chat_message",
-                        "content": message,
-                        "color": "red"
-                    }))
-    except Exception as e:
-        print(f"Error sending existing messages: {e}")
+def encode_chat_history_page(encoded_messages: List[str], page: int, num_pages: int) -> str:
+    """
+    Build a chat_history frame out of messages that are already encoded, the same as `json.dumps`
+    of the whole frame would, without encoding the messages again for every player.
+    """
+    return f'{{"type": "chat_history", "messages": [{", ".join(encoded_messages)}], ' \
+           f'"page": {page}, "num_pages": {num_pages}}}'
 
 
-async def monitor_game_files(websocket: WebSocket, game_id: str, character_name: str, is_mafia: bool):
+class GameWatcher:
     """
-    Monitor game files for changes and send updates to the client.
-    This replaces the polling mechanism from the original player_chat.py.
+    Follows the files of one game on behalf of all of its WebSocket connections.
+    Each chat file's new lines are read once (from the offset reached so far) and fanned out to
+    the connected players by role, so the I/O per second doesn't grow with the number of players.
     """
-    game_dir = get_game_directory(game_id)
-    last_manager_lines = 0
-    last_daytime_lines = 0
-    last_nighttime_lines = 0
-    game_started = False
-    player_voted_out = False
-    last_voting_state = False
-    last_round = 0
-
-    while True:
-        try:
-            # Check if all players have joined and game can start
-            if not game_started and all_players_joined(game_dir):
-                await websocket.send_text(json.dumps({
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.game_dir = get_game_directory(game_id)
+        self.metadata = get_game_metadata(game_id)
+        chat_files_colors = [(PUBLIC_MANAGER_CHAT_FILE, "green"), (PUBLIC_DAYTIME_CHAT_FILE, "blue"),
+                             (PUBLIC_NIGHTTIME_CHAT_FILE, "red")]
+        self.streams = [(file_name, TailReader(self.game_dir / file_name), color)
+                        for file_name, color in chat_files_colors]
+        # Read instead of the files once the game manager publishes it (it does before the game starts,
+        # if the game uses it and runs on this machine), so it's looked for until the game started
+        self.chat_bus_reader = None
+        self.is_chat_bus_looked_up = False
+        status_files = [PERSONAL_STATUS_FILE_FORMAT.format(name)
+                        for name in self.metadata.get_player_names()]
+        self.waiter = FileChangeWaiter(
+            self.game_dir, [file_name for file_name, _ in chat_files_colors] + status_files +
+            [GAME_STATUS_FILE])
+        # Every chat message sent so far, in order, sent to players when they connect. Each message
+        # has its stream (chat file) and its index in the stream, which clients use as a cursor to resume
+        self.history: List[Dict] = []
+        self.stream_lengths = {file_name: 0 for file_name, _ in chat_files_colors}
+        # The chat_history frames sent recently, reused while the history doesn't change, e.g. when many
+        # players reconnect at once. Format: {(is_mafia, cursors, history length): [frame of each page]}
+        self.history_frames_cache: OrderedDict = OrderedDict()
+        # Sending is serialized, so a player that connects gets the history and then only newer messages
+        self.lock = asyncio.Lock()
+        # Players that connect later are told by `subscribe` (so a restarted watcher doesn't tell them again)
+        self.game_started = self.metadata.all_players_joined()
+        self.voting_state = False
+        self.current_round = 0
+        self.notified_voted_out = set()
+        self.vote_requested_rounds: Dict[str, int] = {}  # player -> round in which they were asked to vote
+        self.game_over_frame = None  # sent once the game is over (or cancelled), also to players that connect after that
+        # Set by a game engine that runs in this server when it writes to the game files, so they are
+        # read right away instead of when their change is noticed
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def subscribe(self, websocket: WebSocket, character_name: str, is_mafia: bool,
+                        cursors: Dict[str, int] = None) -> PlayerConnection:
+        """
+        Connect a player, send them everything so far, and from now on the new events.
+        A reconnecting player passes the cursors they got to (stream -> index of the next message),
+        and is sent only the messages they missed.
+        """
+        async with self.lock:
+            if self.task.done() and self.game_over_frame is None:
+                # stopped after the last player left, while this player was waiting for the lock
+                stopped_watcher = True
+            else:
+                stopped_watcher = False
+                connection = await self.subscribe_connected(websocket, character_name, is_mafia, cursors)
+        if stopped_watcher:
+            return await get_game_watcher(self.game_id).subscribe(websocket, character_name, is_mafia, cursors)
+        return connection
+
+    async def subscribe_connected(self, websocket: WebSocket, character_name: str, is_mafia: bool,
+                                  cursors: Dict[str, int]) -> PlayerConnection:
+        """The part of `subscribe` that runs while holding the lock"""
+        if self.game_over_frame is None:
+            await self.broadcast_new_messages()  # the history now includes everything written so far
+        connection = await manager.connect(websocket, self.game_id, character_name, is_mafia)
+        if cursors is None:
+            send_game_state(connection, character_name, is_mafia)
+        self.send_chat_history(connection, is_mafia, cursors or {})
+        if self.game_started:
+            if cursors is None:
+                connection.send(json.dumps({
                     "type": "game_started",
                     "message": "All players have joined! The game begins!"
                 }))
-                await websocket.send_text(json.dumps({
-                    "type": "update_status",
-                    "message": "Game in progress..."
-                }))
-                game_started = True
+            connection.send(json.dumps({
+                "type": "update_status",
+                "message": "Game in progress..."
+            }), coalesce_key="update_status")
+        if self.game_over_frame is not None:
+            connection.send(self.game_over_frame)  # the game ended while this player was connecting
+        else:
+            await self.update_player(character_name, is_mafia)
+        return connection
+
+    def send_chat_history(self, connection: PlayerConnection, is_mafia: bool, cursors: Dict[str, int]):
+        """Send the chat history the player may see in a few frames, instead of a frame per message"""
+        cache_key = (is_mafia, tuple(cursors.get(file_name, 0) for file_name, _, _ in self.streams),
+                     len(self.history))
+        frames = self.history_frames_cache.get(cache_key)
+        if frames is None:
+            visible_messages = [message["encoded"] for message in self.history
+                                if (is_mafia or not message["is_nighttime"]) and
+                                message["index"] >= cursors.get(message["stream"], 0)]
+            num_pages = -(-len(visible_messages) // CHAT_HISTORY_PAGE_SIZE)
+            frames = [encode_chat_history_page(
+                visible_messages[page * CHAT_HISTORY_PAGE_SIZE:(page + 1) * CHAT_HISTORY_PAGE_SIZE],
+                page, num_pages) for page in range(num_pages)]
+            self.history_frames_cache[cache_key] = frames
+            if len(self.history_frames_cache) > CHAT_HISTORY_FRAMES_CACHE_SIZE:
+                self.history_frames_cache.popitem(last=False)
+        else:
+            self.history_frames_cache.move_to_end(cache_key)
+        for frame in frames:
+            connection.send(frame)
+
+    def unsubscribe(self, character_name: str):
+        self.notified_voted_out.discard(character_name)
+        self.vote_requested_rounds.pop(character_name, None)
+
+    def read_new_lines(self) -> List:
+        """Read the new chat lines and the changed status files (blocking, so run in the storage threads)"""
+        self.metadata.refresh()
+        if not self.is_chat_bus_looked_up:
+            # continues from where the files were read up to
+            self.chat_bus_reader = ChatBusReader.attach(
+                self.game_dir, file_offsets={file_name: reader.offset for file_name, reader, _ in self.streams})
+            self.is_chat_bus_looked_up = self.chat_bus_reader is not None or self.metadata.all_players_joined()
+        if self.chat_bus_reader is not None:  # already in the order they were relayed
+            colors = {file_name: color for file_name, _, color in self.streams}
+            return [(file_name, line, colors[file_name]) for file_name, line in self.chat_bus_reader.read_new_lines()]
+        new_lines = [[(file_name, line, color) for line in reader.read_new_lines()]
+                     for file_name, reader, color in self.streams]
+        return list(merge_message_streams(
+            *new_lines, key=lambda stream_line_color: get_message_order_key(stream_line_color[1])))
+
+    async def broadcast_new_messages(self):
+        for file_name, line, color in await storage.run(self.game_dir, self.read_new_lines):
+            fields = {"content": line.rstrip("\n"), "color": color,
+                      "stream": file_name, "index": self.stream_lengths[file_name]}
+            self.stream_lengths[file_name] += 1
+            # Encoded once, and the same frame is sent to all the players that may see it
+            message = {"stream": file_name, "index": fields["index"], "is_nighttime": color == "red",
+                       "encoded": json.dumps(fields)}
+            self.history.append(message)
+            await manager.broadcast_to_game(json.dumps({"type": "chat_message", **fields}),
+                                            self.game_id, only_mafia=message["is_nighttime"])
+
+    async def update_player(self, character_name: str, is_mafia: bool):
+        """Send a player the events that depend on them (e.g. being voted out, or asked to vote)"""
+        if character_name not in self.notified_voted_out and self.metadata.is_voted_out(character_name):
+            await manager.send_personal_message(json.dumps({
+                "type": "voted_out",
+                "message": "You have been eliminated! You can observe but not participate."
+            }), self.game_id, character_name)
+            self.notified_voted_out.add(character_name)
+
+        # Send voting interface when voting starts OR when round changes
+        if self.voting_state and character_name not in self.notified_voted_out and \
+                (is_mafia or not self.metadata.is_nighttime()) and \
+                self.vote_requested_rounds.get(character_name) != self.current_round:
+            self.vote_requested_rounds[character_name] = self.current_round
+            # Check if player has already voted this round
+            voted_player = await safe_get_player_vote(self.game_id, character_name, self.current_round)
+            if voted_player is None:
+                remaining_players = get_remaining_players_for_voting(self.game_id, character_name)
+                await manager.send_personal_message(json.dumps({
+                    "type": "vote_request",
+                    "vote_options": remaining_players,
+                    "round": self.current_round
+                }), self.game_id, character_name)
+            else:
+                # Player already voted, send their vote
+                await manager.send_personal_message(json.dumps({
+                    "type": "already_voted",
+                    "message": f"You have already voted for {voted_player} this round.",
+                    "voted_player": voted_player,
+                    "round": self.current_round
+                }), self.game_id, character_name)
+
+    async def check_game_files(self) -> bool:
+        """Send the new events to the connected players, returns whether the game is over"""
+        await self.broadcast_new_messages()
+
+        # The game manager cancels the game if not all players joined in time
+        if self.metadata.is_cancelled():
+            self.game_over_frame = json.dumps({
+                "type": "game_cancelled",
+                "message": GAME_CANCELLED_MESSAGE
+            })
+            await manager.broadcast_to_game(self.game_over_frame, self.game_id)
+            return True
+
+        # Check if all players have joined and game can start
+        if not self.game_started and self.metadata.all_players_joined():
+            await manager.broadcast_to_game(json.dumps({
+                "type": "game_started",
+                "message": "All players have joined! The game begins!"
+            }), self.game_id)
+            await manager.broadcast_to_game(json.dumps({
+                "type": "update_status",
+                "message": "Game in progress..."
+            }), self.game_id, coalesce_key="update_status")
+            self.game_started = True
+
+        # Check voting state and round changes
+        current_voting_state = self.metadata.is_time_to_vote()
+        self.current_round = get_current_round(self.game_id)
+        if not current_voting_state and self.voting_state:
+            # Voting just ended
+            await manager.broadcast_to_game(json.dumps({
+                "type": "voting_ended",
+                "message": "Voting time has ended."
+            }), self.game_id)
+            self.vote_requested_rounds.clear()
+        self.voting_state = current_voting_state
+
+        for character_name, is_mafia in manager.get_players(self.game_id).items():
+            await self.update_player(character_name, is_mafia)
+
+        # Check if game is over
+        if self.metadata.is_game_over():
+            await self.broadcast_new_messages()  # the last messages, written before game over
+            self.game_over_frame = json.dumps({
+                "type": "game_over",
+                "message": "Game has ended! Time for the survey."
+            })
+            await manager.broadcast_to_game(self.game_over_frame, self.game_id)
+            return True
+        return False
 
-            # Check if this player has been voted out
-            if not player_voted_out and is_voted_out(character_name, game_dir):
-                await websocket.send_text(json.dumps({
-                    "type": "voted_out",
-                    "message": "You have been eliminated! You can observe but not participate."
-                }))
-                player_voted_out = True
+    async def run(self):
+        try:
+            while True:
+                async with self.lock:
+                    if await self.check_game_files():
+                        break
+                await wait_for_changes_or_event(self.waiter, self.wakeup, STATUS_CHECK_INTERVAL_SECONDS)
+            # the game is over or cancelled, so its votes won't be checked anymore
+            await safe_delete_votes(self.game_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error monitoring game files of game {self.game_id}: {e}")
+        finally:
+            if game_watchers.get(self.game_id) is self:
+                del game_watchers[self.game_id]
+            # after any read of the files that is still running
+            asyncio.ensure_future(storage.run(self.game_dir, self.close_files))
+
+    def close_files(self):
+        self.waiter.close()
+        if self.chat_bus_reader is not None:
+            self.chat_bus_reader.close()
+        for _, reader, _ in self.streams:
+            reader.close()
+        # the appends of the players are over, and an engine that runs in this server closes its writer itself
+        if self.game_over_frame is not None and self.game_id not in embedded_games:
+            close_game_file_writer(self.game_dir)
+
+
+# One watcher per game with connected players
+# Format: {game_id: GameWatcher}
+game_watchers: Dict[str, GameWatcher] = {}
+
+
+def get_game_watcher(game_id: str) -> GameWatcher:
+    """Get the watcher of a game, starting it when the first player of the game connects"""
+    watcher = game_watchers.get(game_id)
+    if watcher is None:
+        watcher = game_watchers[game_id] = GameWatcher(game_id)
+        watcher.start()
+    return watcher
+
+
+def release_game_watcher(game_id: str, character_name: str):
+    """Forget a disconnected player, and stop the game's watcher when nobody is connected"""
+    watcher = game_watchers.get(game_id)
+    if watcher is None:
+        return
+    if not manager.is_connected(game_id, character_name):  # not replaced by a newer connection
+        watcher.unsubscribe(character_name)
+    if not manager.get_players(game_id):
+        del game_watchers[game_id]
+        watcher.task.cancel()
 
-            # Check if game is over
-            if is_game_over(game_dir):
-                await websocket.send_text(json.dumps({
-                    "type": "game_over",
-                    "message": "Game has ended! Time for the survey."
-                }))
-                break
-
-            # Check for new manager messages
-            manager_file = game_dir / PUBLIC_MANAGER_CHAT_FILE
-            if manager_file.exists():
-                lines = manager_file.read_text().splitlines()
-                if len(lines) > last_manager_lines:
-                    new_messages = lines[last_manager_lines:]
-                    for message in new_messages:
-                        await websocket.send_text(json.dumps({
-                            "type": "chat_message",
-                            "content": message,
-                            "color": "green"
-                        }))
-                    last_manager_lines = len(lines)
-
-            # Check for new daytime messages
-            daytime_file = game_dir / PUBLIC_DAYTIME_CHAT_FILE
-            if daytime_file.exists():
-                lines = daytime_file.read_text().splitlines()
-                if len(lines) > last_daytime_lines:
-                    new_messages = lines[last_daytime_lines:]
-                    for message in new_messages:
-                        await websocket.send_text(json.dumps({
-                            "type": "chat_message",
-                            "content": message,
-                            "color": "blue"
-                        }))
-                    last_daytime_lines = len(lines)
-
-            # Check for new nighttime messages (only for mafia)
-            if is_mafia:
-                nighttime_file = game_dir / PUBLIC_NIGHTTIME_CHAT_FILE
-                if nighttime_file.exists():
-                    lines = nighttime_file.read_text().splitlines()
-                    if len(lines) > last_nighttime_lines:
-                        new_messages = lines[last_nighttime_lines:]
-                        for message in new_messages:
-                            await websocket.send_text(json.dumps({
-                                "type": "chat_message",
-                                "content": message,
-                                "color": "red"
-                            }))
-                        last_nighttime_lines = len(lines)
-
-            # Check voting state and round changes
-            current_voting_state = is_time_to_vote(game_dir)
-            current_round = get_current_round(game_id)
-
-            # Send voting interface when voting starts OR when round changes
-            if current_voting_state and not player_voted_out:
-                if is_mafia or not is_nighttime(game_dir):
-                    # Check if we need to send/update voting interface
-                    should_send_voting = False
-
-                    if not last_voting_state:
-                        # Voting just started
-                        should_send_voting = True
-                    elif current_round != last_round:
-                        # New round started
-                        should_send_voting = True
-
-                    if should_send_voting:
-                        # Check if player has already voted this round
-                        if not safe_has_player_voted(game_id, character_name, current_round):
-                            remaining_players = get_remaining_players_for_voting(game_id, character_name)
-                            await websocket.send_text(json.dumps({
-                                "type": "vote_request",
-                                "vote_options": remaining_players,
-                                "round": current_round
-                            }))
-                        else:
-                            # Player already voted, send their vote
-                            voted_player = safe_get_player_vote(game_id, character_name, current_round)
-                            await websocket.send_text(json.dumps({
-                                "type": "already_voted",
-                                "message": f"You have already voted for {voted_player} this round.",
-                                "voted_player": voted_player,
-                                "round": current_round
-                            }))
-
-            elif not current_voting_state and last_voting_state:
-                # Voting just ended
-                await websocket.send_text(json.dumps({
-                    "type": "voting_ended",
-                    "message": "Voting time has ended."
-                }))
 
-            last_voting_state = current_voting_state
-            last_round = current_round
+def notify_game_watcher(game_id: str):
+    """Wake up the game's watcher, if players of the game are connected"""
+    watcher = game_watchers.get(game_id)
+    if watcher is not None:
+        watcher.wakeup.set()
 
-            # Wait before checking again
-            await asyncio.sleep(1)
 
-        except Exception as e:
-            print(f"Error monitoring game files: {e}")
-            break
+# Whether the server runs the game engine (the game manager of mafia_main.py) of the games itself,
+# instead of a separate mafia_main.py process per game. Set by -e/--embedded-engine
+run_embedded_engine = False
+
+# The games whose engine runs in this server, and the inboxes of their players (created by whichever
+# of the server and the engine needs one first, so input that arrives while the engine loads isn't lost)
+# Format: {game_id: {player_name: PlayerInbox}}
+embedded_games: Dict[str, Dict[str, PlayerInbox]] = {}
+
+# The engines run in an event loop of their own, in a separate thread, since they write the game files
+# (journal, status files) blocking, which must not stall the server's handlers
+engine_loop: asyncio.AbstractEventLoop = None
+
+
+def get_engine_loop() -> asyncio.AbstractEventLoop:
+    global engine_loop
+    if engine_loop is None:
+        engine_loop = asyncio.new_event_loop()
+        threading.Thread(target=engine_loop.run_forever, name="game-engines", daemon=True).start()
+    return engine_loop
+
+
+def start_embedded_game(game_id: str):
+    """
+    Start running the game's engine in this server (when enabled), unless it already runs or the game
+    is over (or cancelled). A game that was running when the server stopped continues from its journal.
+    Must be called after loading the game's metadata.
+    """
+    metadata = get_game_metadata(game_id)
+    if not run_embedded_engine or game_id in embedded_games or metadata.is_game_over() or metadata.is_cancelled():
+        return
+    inboxes = embedded_games[game_id] = {}
+    server_loop = asyncio.get_running_loop()
+    future = asyncio.run_coroutine_threadsafe(
+        run_embedded_game(game_id, inboxes, lambda: server_loop.call_soon_threadsafe(notify_game_watcher, game_id)),
+        get_engine_loop())
+    future.add_done_callback(
+        lambda done_future: server_loop.call_soon_threadsafe(on_embedded_game_done, game_id, done_future))
+    print(f"Started running the engine of game {game_id}")
+
+
+async def run_embedded_game(game_id: str, inboxes: Dict[str, PlayerInbox], on_update):
+    """Runs in the engines' event loop, from loading the game (and replaying its journal) to its end"""
+    try:
+        game = Game(get_game_directory(game_id), operator_prefix=f"[game {game_id}] ", inboxes=inboxes,
+                    on_update=on_update)
+    except GameAlreadyRunningError:
+        print(f"The engine of game {game_id} isn't run in this server, since another game manager runs it")
+        return
+    await game.run()
+
+
+def on_embedded_game_done(game_id: str, future):
+    del embedded_games[game_id]
+    if not future.cancelled() and future.exception() is not None:
+        print(f"The engine of game {game_id} has crashed: {future.exception()!r}")
+
+
+def get_player_inbox(game_id: str, character_name: str):
+    """The in-memory input of the player, if their game's engine runs in this server, otherwise None"""
+    inboxes = embedded_games.get(game_id)
+    if inboxes is None or character_name not in get_game_metadata(game_id).get_player_names():
+        return None
+    return inboxes.setdefault(character_name, PlayerInbox())
+
+
+def append_to_game_file(game_dir: Path, file: Path, text: str):
+    """
+    Append through the game's shared file writer (blocking, so run in the storage threads). The writer is
+    looked up only now, since an engine that runs in this server closes it when its game ends.
+    """
+    get_game_file_writer(game_dir).append(file, text)
 
 
 async def handle_player_action(message_data: dict, game_id: str, character_name: str, is_mafia: bool):
@@ -687,61 +1058,70 @@ async def handle_player_action(message_data: dict, game_id: str, character_name:
     """
     try:
         game_dir = get_game_directory(game_id)
+        metadata = await load_game_metadata(game_id)
         action_type = message_data.get("type")
         thread_id = threading.current_thread().ident
 
         # Check if player is voted out
-        if is_voted_out(character_name, game_dir):
+        if metadata.is_voted_out(character_name):
             return  # Voted out players can't perform actions
 
         if action_type == "chat_message":
             content = message_data.get("content", "").strip()
             if content:
                 # Check if player can chat (not during voting, not nighttime for non-mafia)
-                if is_time_to_vote(game_dir):
+                if metadata.is_time_to_vote():
                     return  # Can't chat during voting
 
-                if not is_mafia and is_nighttime(game_dir):
+                if not is_mafia and metadata.is_nighttime():
                     return  # Non-mafia can't chat during nighttime
 
-                # Write to personal chat file (thread-safe file operations)
+                # Write to personal chat file (the shared game file writer is thread-safe)
+                line = format_message(character_name, content)
                 chat_file = game_dir / PERSONAL_CHAT_FILE_FORMAT.format(character_name)
-                with _data_lock:  # Ensure thread-safe file writing
-                    with open(chat_file, "a") as f:
-                        f.write(format_message(character_name, content))
+                await storage.run(game_dir, append_to_game_file, game_dir, chat_file, line)
+
+                # Hand the message to the game engine if it runs in this server, instead of it reading the file
+                inbox = get_player_inbox(game_id, character_name)
+                if inbox is not None:
+                    inbox.put_chat_line(line)
 
                 print(f"[Thread {thread_id}] {character_name} sent message: {content[:50]}...")
 
         elif action_type == "vote":
             voted_player = message_data.get("voted_player")
-            if voted_player and is_time_to_vote(game_dir):
+            if voted_player and metadata.is_time_to_vote():
                 # Check if this player can vote (not nighttime for non-mafia)
-                if not is_mafia and is_nighttime(game_dir):
+                if not is_mafia and metadata.is_nighttime():
                     return  # Non-mafia can't vote during nighttime
 
                 current_round = get_current_round(game_id)
 
                 # Thread-safe vote checking and recording
-                if safe_has_player_voted(game_id, character_name, current_round):
+                if await safe_has_player_voted(game_id, character_name, current_round):
                     return  # Already voted this round
 
                 # Verify the voted player is in the remaining players list
                 remaining_players = get_remaining_players_for_voting(game_id, character_name)
                 if voted_player in remaining_players:
+                    # Record vote in thread-safe tracking system (before waiting for the write). Only
+                    # the first vote of the round is recorded, even if another one arrived meanwhile
+                    if not await safe_record_vote(game_id, character_name, current_round, voted_player):
+                        return
+
                     # Write vote to personal vote file (thread-safe)
                     vote_file = game_dir / PERSONAL_VOTE_FILE_FORMAT.format(character_name)
-                    with _data_lock:
-                        with open(vote_file, "a") as f:
-                            f.write(f"{voted_player}\n")
+                    await storage.run(game_dir, append_to_game_file, game_dir, vote_file, f"{voted_player}\n")
 
-                    # Record vote in thread-safe tracking system
-                    safe_record_vote(game_id, character_name, current_round, voted_player)
+                    inbox = get_player_inbox(game_id, character_name)
+                    if inbox is not None:
+                        inbox.put_vote(voted_player)
 
                     print(f"[Thread {thread_id}] {character_name} voted for {voted_player} in round {current_round}")
 
         elif action_type == "start_survey":
             # Start the survey for this player
-            if is_game_over(game_dir):
+            if metadata.is_game_over():
                 # This would integrate with your survey system
                 # For now, we'll send a message that survey should start
                 pass
@@ -750,20 +1130,12 @@ async def handle_player_action(message_data: dict, game_id: str, character_name:
         print(f"[Thread {threading.current_thread().ident}] Error handling player action: {e}")
 
 
-def get_llm_player_name_web(game_dir: Path) -> str:
+def get_llm_player_name_web(game_id: str) -> str:
     """
     Web version of get_llm_player_name from player_survey.py
     """
     try:
-        player_names_file = game_dir / PLAYER_NAMES_FILE
-        if not player_names_file.exists():
-            return None
-
-        for player_name in player_names_file.read_text().splitlines():
-            llm_log_file = game_dir / LLM_LOG_FILE_FORMAT.format(player_name)
-            if llm_log_file.exists():
-                return player_name
-        return None
+        return get_game_metadata(game_id).get_llm_player_name()
     except Exception as e:
         print(f"Error getting LLM player name: {e}")
         return None
@@ -774,8 +1146,7 @@ def get_survey_data(game_id: str, character_name: str) -> dict:
     Prepare survey data for the web interface
     """
     try:
-        game_dir = get_game_directory(game_id)
-        llm_player_name = get_llm_player_name_web(game_dir)
+        llm_player_name = get_llm_player_name_web(game_id)
 
         survey_data = {
             "has_llm": llm_player_name is not None,
@@ -791,11 +1162,9 @@ def get_survey_data(game_id: str, character_name: str) -> dict:
 
         if llm_player_name:
             # Get all players for LLM identification
-            player_names_file = game_dir / PLAYER_NAMES_FILE
-            if player_names_file.exists():
-                all_players = player_names_file.read_text().splitlines()
-                survey_data["all_players"] = all_players
-                survey_data["other_players"] = [p for p in all_players if p != character_name]
+            all_players = get_game_metadata(game_id).get_player_names()
+            survey_data["all_players"] = all_players
+            survey_data["other_players"] = [p for p in all_players if p != character_name]
 
         return survey_data
     except Exception as e:
@@ -821,7 +1190,7 @@ def save_survey_response(game_id: str, character_name: str, survey_response: dic
         with open(survey_file, "w") as f:
             # Save LLM identification if applicable
             if "llm_guess" in survey_response:
-                llm_player_name = get_llm_player_name_web(game_dir)
+                llm_player_name = get_llm_player_name_web(game_id)
                 guess_correctness = int(survey_response["llm_guess"] == llm_player_name)
                 f.write(f"{LLM_IDENTIFICATION}{METRIC_NAME_AND_SCORE_DELIMITER}{guess_correctness}\n")
 
@@ -854,10 +1223,10 @@ async def submit_survey(request: Request, game_id: str):
     Handle survey submission
     """
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    session = await safe_get_session(session_id) if session_id else {}
+    if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
 
-    session = player_sessions[session_id]
     if session["game_id"] != game_id:
         raise HTTPException(status_code=403, detail="Wrong game")
 
@@ -883,7 +1252,8 @@ async def submit_survey(request: Request, game_id: str):
         survey_response["comments"] = form_data["comments"]
 
     # Save survey response
-    success = save_survey_response(game_id, character_name, survey_response)
+    success = await storage.run(get_game_directory(game_id), save_survey_response,
+                                game_id, character_name, survey_response)
 
     if success:
         return templates.TemplateResponse(
@@ -900,7 +1270,7 @@ async def start_survey(request: Request, game_id: str):
     Redirect to survey page instead of running terminal survey
     """
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    if not session_id or not await safe_get_session(session_id):
         raise HTTPException(status_code=401, detail="Invalid session")
 
     return RedirectResponse(url=f"/survey/{game_id}", status_code=303)
@@ -911,17 +1281,16 @@ async def survey_identify_page(request: Request, game_id: str):
     First part of survey - LLM identification
     """
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    session = await safe_get_session(session_id) if session_id else {}
+    if not session:
         return RedirectResponse(url="/")
 
-    session = player_sessions[session_id]
     if session["game_id"] != game_id:
         return RedirectResponse(url="/")
 
     character_name = session["character_name"]
-    game_dir = get_game_directory(game_id)
 
-    if not is_game_over(game_dir):
+    if not (await load_game_metadata(game_id)).is_game_over():
         return RedirectResponse(url=f"/game/{game_id}")
 
     survey_data = get_survey_data(game_id, character_name)
@@ -942,15 +1311,16 @@ async def submit_identification(request: Request, game_id: str, llm_guess: str =
     Handle LLM identification submission and redirect to metrics
     """
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    session = await safe_get_session(session_id) if session_id else {}
+    if not session:
         raise HTTPException(status_code=401, detail="Invalid session")
 
-    session = player_sessions[session_id]
     if session["game_id"] != game_id:
         raise HTTPException(status_code=403, detail="Wrong game")
 
     # Store the guess in session for the next page
     session["llm_guess"] = llm_guess
+    await safe_set_session(session_id, session)
 
     return RedirectResponse(url=f"/survey-metrics/{game_id}", status_code=303)
 
@@ -960,17 +1330,16 @@ async def survey_metrics_page(request: Request, game_id: str):
     Second part of survey - show results and collect metrics
     """
     session_id = request.cookies.get("session_id")
-    if not session_id or session_id not in player_sessions:
+    session = await safe_get_session(session_id) if session_id else {}
+    if not session:
         return RedirectResponse(url="/")
 
-    session = player_sessions[session_id]
     if session["game_id"] != game_id:
         return RedirectResponse(url="/")
 
     character_name = session["character_name"]
-    game_dir = get_game_directory(game_id)
 
-    if not is_game_over(game_dir):
+    if not (await load_game_metadata(game_id)).is_game_over():
         return RedirectResponse(url=f"/game/{game_id}")
 
     survey_data = get_survey_data(game_id, character_name)
@@ -992,12 +1361,33 @@ async def survey_metrics_page(request: Request, game_id: str):
     )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the web interface of the Mafia games")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="number of worker processes, e.g. the number of CPU cores of this host "
+                             "(default: 1)")
+    parser.add_argument("-s", "--session-store", default=DEFAULT_WEB_SESSION_STORE_FILE,
+                        help=f"SQLite database in which several workers share the players' sessions "
+                             f"and votes (default: {DEFAULT_WEB_SESSION_STORE_FILE})")
+    parser.add_argument("-e", "--embedded-engine", action="store_true",
+                        help="run the game engine of each game inside the server, starting it when the "
+                             "first player joins (instead of running mafia_main.py for each game), so "
+                             "players' messages reach each other within milliseconds")
+    args = parser.parse_args()
+    if args.embedded_engine and args.workers > 1:
+        parser.error("the embedded engine gets the players' input in memory, so it needs a single worker")
+    run_embedded_engine = args.embedded_engine
+    if args.workers > 1:
+        # read by each worker when it imports this module. Each worker follows the game files itself,
+        # so the events of a game reach all of its players whichever workers they are connected to
+        os.environ[WEB_SESSION_STORE_ENV_VAR] = str(Path(args.session_store).resolve())
+
     print("=" * 60)
     print("🎭 MAFIA GAME WEB SERVER - MULTI-PLAYER SUPPORT")
     print("=" * 60)
     print("✅ Server runs ONCE and handles multiple concurrent players")
     print("✅ Each player gets their own secure session and thread")
     print("✅ Multiple games can run simultaneously")
+    print(f"✅ Running {args.workers} worker process(es)")
     print("✅ Thread-safe operations for all player interactions")
     print()
     print("🔗 Connection Instructions:")
@@ -1011,11 +1401,15 @@ if __name__ == "__main__":
 
     try:
         uvicorn.run(
-            app,
+            # several workers import the app by name
+            "main:app" if args.workers > 1 else app,
+            workers=args.workers,
             host="127.0.0.1",
             port=8000,
             log_level="info",
-            access_log=True
+            access_log=True,
+            # compresses the frames for browsers that support it (all modern ones), mostly the chat history
+            ws_per_message_deflate=True
         )
     except KeyboardInterrupt:
         print("\n🛑 Server stopped by user")
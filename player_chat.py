@@ -1,6 +1,10 @@
+import sys
 from game_constants import *  # incl. argparse, time, Path (from pathlib), colored (from termcolor)
-from game_status_checks import is_game_over, is_time_to_vote, all_players_joined, get_is_mafia, \
-    is_nighttime
+from game_status_checks import is_game_over, get_is_mafia, get_who_wins, get_game_status, \
+    JoinBarrier
+from file_watcher import FileChangeWaiter
+from tail_reader import TailReader
+from chat_bus import ChatBusReader
 
 
 def introducing_mafia_members(game_dir, is_mafia, name):
@@ -44,20 +48,69 @@ def welcome_player(game_dir):
     (game_dir / PERSONAL_STATUS_FILE_FORMAT.format(name)).write_text(JOINED)
     introducing_mafia_members(game_dir, is_mafia, name)
     print(colored(WAITING_FOR_ALL_PLAYERS_TO_JOIN_MESSAGE, MANAGER_COLOR))
-    while not all_players_joined(game_dir):
-        continue
+    if not JoinBarrier(game_dir).wait_for_game_start():
+        print(colored(GAME_CANCELLED_MESSAGE, MANAGER_COLOR))
+        sys.exit()
     # The game manager automatically posts a message that will be printed when the game starts
-    return name, is_mafia  # name is used only in the joint read-and-write interface (with threads)
+    return name, is_mafia  # name is used only in the joint read-and-write interface
 
 
-def display_lines_from_file(game_dir, file_name, num_read_lines, display_color):
-    with open(game_dir / file_name, "r") as f:
-        lines = f.readlines()[num_read_lines:]
-    if len(lines) > 0:  # this `if` in needed because of `print()` that is used for multithreading
+class PublicChatFollower:
+    """
+    Follows the public chat files that a player can see, like `tail -f`: remembers the byte offset
+    reached in each file, and blocks on changes of these files (or of the game status) instead of
+    re-reading them in a busy loop. When the game manager publishes the chat bus (and it's on the
+    same machine), the new lines are read from the bus instead of the files.
+    Must be created after the game started, since the game manager creates the bus before that.
+    """
+
+    def __init__(self, game_dir, is_mafia):
+        chat_files_colors = [(PUBLIC_MANAGER_CHAT_FILE, MANAGER_COLOR),
+                             (PUBLIC_DAYTIME_CHAT_FILE, DAYTIME_COLOR)]
+        if is_mafia:  # only mafia can see what happens during nighttime
+            chat_files_colors.append((PUBLIC_NIGHTTIME_CHAT_FILE, NIGHTTIME_COLOR))
+        self.colors = dict(chat_files_colors)
+        self.chat_bus_reader = ChatBusReader.attach(game_dir, list(self.colors))
+        self.readers_colors = [(TailReader(game_dir / file_name), color)
+                               for file_name, color in chat_files_colors]
+        watched_files = [file_name for file_name, _ in chat_files_colors] + [GAME_STATUS_FILE]
+        self.waiter = FileChangeWaiter(game_dir, watched_files)
+
+    def read_new_lines(self):
+        """Returns the new (line, color) pairs of all files, in the order they were written"""
+        if self.chat_bus_reader is not None:  # already in the order they were relayed
+            return [(line, self.colors[stream])
+                    for stream, line in self.chat_bus_reader.read_new_lines()]
+        streams = [[(line, color) for line in reader.read_new_lines()]
+                   for reader, color in self.readers_colors]
+        return list(merge_message_streams(
+            *streams, key=lambda line_and_color: get_message_order_key(line_and_color[0])))
+
+    def wait(self, timeout=STATUS_CHECK_INTERVAL_SECONDS):
+        return self.waiter.wait(timeout)
+
+    async def wait_async(self, timeout=STATUS_CHECK_INTERVAL_SECONDS):
+        return await self.waiter.wait_async(timeout)
+
+    def close(self):
+        self.waiter.close()
+        if self.chat_bus_reader is not None:
+            self.chat_bus_reader.close()
+        for reader, _ in self.readers_colors:
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def display_lines(lines_and_colors):
+    if len(lines_and_colors) > 0:  # this `if` in needed because of `print()` for multithreading
         print()  # prevents the messages from being printed in the same line as the middle of input
-        for line in lines:
+        for line, display_color in lines_and_colors:
             print(colored(line.strip(), display_color))
-    return len(lines)
 
 
 def ask_player_to_vote():
@@ -65,9 +118,9 @@ def ask_player_to_vote():
 
 
 def ask_player_to_vote_only_once(already_asked, game_dir, is_mafia):
-    if is_time_to_vote(game_dir):
-        # leaving the is_nighttime check to the end because it's expensive and might not be needed
-        if not already_asked and (is_mafia or not is_nighttime(game_dir)):
+    status = get_game_status(game_dir)  # both checks are of the same moment
+    if status.is_time_to_vote():
+        if not already_asked and (is_mafia or not status.is_nighttime()):
             ask_player_to_vote()
             already_asked = True
     else:
@@ -76,22 +129,17 @@ def ask_player_to_vote_only_once(already_asked, game_dir, is_mafia):
 
 
 def read_game_text_loop(is_mafia, game_dir):
-    num_read_lines_manager = num_read_lines_daytime = num_read_lines_nighttime = 0
     already_asked = False
-    while not is_game_over(game_dir):
-        num_read_lines_manager += display_lines_from_file(
-            game_dir, PUBLIC_MANAGER_CHAT_FILE, num_read_lines_manager, MANAGER_COLOR)
-        # only current phase file will have new messages, so no need to run expensive is_nighttime()
-        num_read_lines_daytime += display_lines_from_file(
-            game_dir, PUBLIC_DAYTIME_CHAT_FILE, num_read_lines_daytime, DAYTIME_COLOR)
-        if is_mafia:  # only mafia can see what happens during nighttime
-            num_read_lines_nighttime += display_lines_from_file(
-                game_dir, PUBLIC_NIGHTTIME_CHAT_FILE, num_read_lines_nighttime, NIGHTTIME_COLOR)
-        already_asked = ask_player_to_vote_only_once(already_asked, game_dir, is_mafia)
+    with PublicChatFollower(game_dir, is_mafia) as follower:
+        while not is_game_over(game_dir):
+            display_lines(follower.read_new_lines())
+            already_asked = ask_player_to_vote_only_once(already_asked, game_dir, is_mafia)
+            follower.wait()
+        display_lines(follower.read_new_lines())  # the last messages, written before game over
 
 
 def game_over_message(game_dir):
-    who_wins = (game_dir / WHO_WINS_FILE).read_text().strip()
+    who_wins = get_who_wins(game_dir).strip()
     print(colored(who_wins, MANAGER_COLOR))
     mafia_names = (game_dir / MAFIA_NAMES_FILE).read_text().splitlines()  # removes the "\n"
     print(colored(MAFIA_REVELATION_MESSAGE, MANAGER_COLOR),
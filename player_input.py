@@ -1,7 +1,9 @@
+import sys
 from game_constants import *  # incl. random, Path (from pathlib), colored (from termcolor)
-from game_status_checks import is_nighttime, is_game_over, is_voted_out, is_time_to_vote, \
-    all_players_joined, get_is_mafia
+from game_status_checks import is_nighttime, is_game_over, is_time_to_vote, \
+    get_is_mafia, get_remaining_players, get_game_status, JoinBarrier, wait_until
 from player_survey import run_survey_about_llm_player
+from game_io import get_game_file_writer
 
 
 def get_name_and_role(game_dir):
@@ -11,8 +13,9 @@ def get_name_and_role(game_dir):
     name = get_player_name_from_user(player_names, GET_CODE_NAME_FROM_USER_MESSAGE)
     is_mafia = get_is_mafia(name, game_dir)
     print(colored(WAITING_FOR_ALL_PLAYERS_TO_JOIN_MESSAGE, MANAGER_COLOR))
-    while not all_players_joined(game_dir):
-        continue
+    if not JoinBarrier(game_dir).wait_for_game_start():
+        print(colored(GAME_CANCELLED_MESSAGE, MANAGER_COLOR))
+        sys.exit()
     print(colored(YOU_CAN_START_WRITING_MESSAGE, MANAGER_COLOR))
     return name, is_mafia
 
@@ -24,23 +27,40 @@ def notify_only_once_about_finish_writing(already_notified):
     return already_notified
 
 
-def collect_vote(name, game_dir):
-    remaining_player_names = (game_dir / REMAINING_PLAYERS_FILE).read_text().splitlines()
+def get_vote_options(name, game_dir):
+    remaining_player_names = list(get_remaining_players(game_dir))
     remaining_player_names.remove(name)  # players shouldn't vote for themselves
-    voted_name = get_player_name_from_user(remaining_player_names,
+    return remaining_player_names
+
+
+def write_vote(name, voted_name, game_dir):
+    get_game_file_writer(game_dir).append(PERSONAL_VOTE_FILE_FORMAT.format(name), voted_name + "\n")
+
+
+def write_chat_message(name, user_input, game_dir):
+    get_game_file_writer(game_dir).append(PERSONAL_CHAT_FILE_FORMAT.format(name),
+                                          format_message(name, user_input))
+
+
+def collect_vote(name, game_dir):
+    voted_name = get_player_name_from_user(get_vote_options(name, game_dir),
                                            GET_VOTED_NAME_MESSAGE_FORMAT.format(name))
-    with open(game_dir / PERSONAL_VOTE_FILE_FORMAT.format(name), "a") as f:
-        f.write(voted_name + "\n")
+    write_vote(name, voted_name, game_dir)
 
 
 def write_text_to_game_loop(name, is_mafia, game_dir):
     already_notified = False
-    while not is_game_over(game_dir):
-        if is_voted_out(name, game_dir):
+    while not (status := get_game_status(game_dir)).is_game_over():
+        if status.is_voted_out(name):
             already_notified = notify_only_once_about_finish_writing(already_notified)
-            continue  # can't write or vote anymore, waiting for final survey
-        if not is_mafia and is_nighttime(game_dir):
-            continue  # only mafia can communicate during nighttime
+            # can't write or vote anymore, waiting for final survey
+            wait_until(lambda: is_game_over(game_dir), game_dir, [GAME_STATUS_FILE])
+            continue
+        if not is_mafia and status.is_nighttime():
+            # only mafia can communicate during nighttime
+            wait_until(lambda: not is_nighttime(game_dir) or is_game_over(game_dir), game_dir,
+                       [GAME_STATUS_FILE])
+            continue
         user_input = input(colored(GET_CHAT_INPUT_MESSAGE, MANAGER_COLOR)).strip()
         if not user_input:
             continue
@@ -49,11 +69,10 @@ def write_text_to_game_loop(name, is_mafia, game_dir):
                 print(colored(NOT_TIME_TO_VOTE_MESSAGE, MANAGER_COLOR))
                 continue
             collect_vote(name, game_dir)
-            while is_time_to_vote(game_dir):
-                continue  # wait for voting time to end when all players have voted
+            # wait for voting time to end when all players have voted
+            wait_until(lambda: not is_time_to_vote(game_dir), game_dir, [GAME_STATUS_FILE])
         elif not is_time_to_vote(game_dir):  # if it's time to vote then players can't chat
-            with open(game_dir / PERSONAL_CHAT_FILE_FORMAT.format(name), "a") as f:
-                f.write(format_message(name, user_input))
+            write_chat_message(name, user_input, game_dir)
 
 
 def main():
@@ -1,31 +1,150 @@
-from threading import Thread
-from termcolor import colored
-from game_constants import get_game_dir_from_argv
-from player_chat import read_game_text_loop, welcome_player, game_over_message
-from player_input import write_text_to_game_loop
+import os
+import sys
+import codecs
+import asyncio
+from game_constants import *  # incl. argparse, time, Path (from pathlib), colored (from termcolor)
+from game_status_checks import is_game_over, is_time_to_vote, get_game_status
+from player_chat import welcome_player, game_over_message, PublicChatFollower
+from player_input import get_vote_options, write_vote, write_chat_message
 from player_survey import run_survey_about_llm_player
 
-THREADING_WARNING_MESSAGE = "Pay attention! This interface allows you to read and write in the " \
-                            "same terminal, but it is not recommended!\n" \
-                            "It is better to use different terminals for viewing the chat and " \
-                            "for entering input:\n" \
-                            "\t`player_chat.py` and `player_input.py`, respectively.\n"
-WARNING_COLOR = "light_red"
+try:
+    import termios
+    import tty
+except ImportError:  # not a Unix terminal, so input is read line by line as typed
+    termios = tty = None
 
+INPUT_READ_SIZE = 1024
+BACKSPACE_CHARS = ("\x7f", "\b")
+CLEAR_LINE = "\r\033[K"  # moves to the start of the line and erases it
 
-def game_read_and_write_loop(name, is_mafia, game_dir):
-    write_thread = Thread(target=write_text_to_game_loop, args=(name, is_mafia, game_dir))
-    # daemon: writing in the background, so it can stop when eliminated and still allow reading
-    write_thread.daemon = True
-    write_thread.start()
-    read_game_text_loop(is_mafia, game_dir)
+
+class TerminalClient:
+    """
+    Follows the public chat and reads the player's input in a single event loop, instead of two
+    threads that fight over the terminal. The client keeps the line that is being typed, so when
+    messages arrive they are printed above it and it's redrawn below them, never garbled.
+    """
+
+    def __init__(self, name, is_mafia, game_dir):
+        self.name = name
+        self.is_mafia = is_mafia
+        self.game_dir = game_dir
+        self.input_buffer = ""
+        # keeps the start of a character that was split between two reads until its end arrives
+        self.input_decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self.vote_options = None  # player names by ID, while waiting for the chosen vote
+        self.has_voted = False
+        self.already_asked_to_vote = False
+        self.already_notified_voted_out = False
+
+    def redraw_input_line(self):
+        sys.stdout.write(CLEAR_LINE + colored(GET_CHAT_INPUT_MESSAGE, MANAGER_COLOR) +
+                         self.input_buffer)
+        sys.stdout.flush()
+
+    def print_above_input(self, text, color=MANAGER_COLOR):
+        sys.stdout.write(CLEAR_LINE + colored(text, color) + "\n")
+        self.redraw_input_line()
+
+    def on_input_ready(self):
+        data = os.read(sys.stdin.fileno(), INPUT_READ_SIZE)
+        if not data:  # end of input, only the chat is followed from now on
+            asyncio.get_running_loop().remove_reader(sys.stdin.fileno())
+            return
+        for char in self.input_decoder.decode(data):
+            if char in ("\r", "\n"):
+                user_input, self.input_buffer = self.input_buffer.strip(), ""
+                sys.stdout.write("\n")
+                self.handle_input(user_input)
+            elif char in BACKSPACE_CHARS:
+                self.input_buffer = self.input_buffer[:-1]
+            elif char.isprintable():
+                self.input_buffer += char
+        self.redraw_input_line()
+
+    def ask_for_vote(self):
+        self.vote_options = get_player_names_by_id(get_vote_options(self.name, self.game_dir))
+        enumerated_names = ",   ".join([f"{i}: {name}" for i, name in self.vote_options.items()])
+        self.print_above_input(f"{GET_VOTED_NAME_MESSAGE_FORMAT.format(self.name)}\n"
+                               f"{enumerated_names}")
+
+    def handle_vote_choice(self, name_id):
+        if name_id not in self.vote_options:
+            self.ask_for_vote()  # asks again, like in the separate input interface
+            return
+        voted_name = self.vote_options[name_id]
+        self.vote_options = None
+        if is_time_to_vote(self.game_dir):  # voting might have closed while choosing
+            write_vote(self.name, voted_name, self.game_dir)
+            self.has_voted = True
+
+    def handle_input(self, user_input):
+        if not user_input:
+            return
+        status = get_game_status(self.game_dir)  # all the checks are of the same moment
+        if self.vote_options is not None:
+            self.handle_vote_choice(user_input)
+        elif status.is_voted_out(self.name):
+            self.print_above_input(YOU_CANT_WRITE_MESSAGE)
+        elif not self.is_mafia and status.is_nighttime():
+            self.print_above_input(ONLY_MAFIA_CAN_WRITE_MESSAGE)
+        elif user_input == VOTE_FLAG:
+            if not status.is_time_to_vote():
+                self.print_above_input(NOT_TIME_TO_VOTE_MESSAGE)
+            elif self.has_voted:
+                self.print_above_input(ALREADY_VOTED_MESSAGE)
+            else:
+                self.ask_for_vote()
+        elif not status.is_time_to_vote():  # if it's time to vote then players can't chat
+            write_chat_message(self.name, user_input, self.game_dir)
+
+    def update_status(self):
+        status = get_game_status(self.game_dir)  # all the checks are of the same moment
+        if status.is_time_to_vote():
+            if not self.already_asked_to_vote and (self.is_mafia or not status.is_nighttime()):
+                self.print_above_input(VOTE_INSTRUCTION_MESSAGE)
+                self.already_asked_to_vote = True
+        else:
+            self.already_asked_to_vote = self.has_voted = False
+            self.vote_options = None
+        if not self.already_notified_voted_out and status.is_voted_out(self.name):
+            self.print_above_input(YOU_CANT_WRITE_MESSAGE)
+            self.already_notified_voted_out = True
+
+    async def follow_chat(self):
+        with PublicChatFollower(self.game_dir, self.is_mafia) as follower:
+            while not is_game_over(self.game_dir):
+                for line, color in follower.read_new_lines():
+                    self.print_above_input(line.strip(), color)
+                self.update_status()
+                await follower.wait_async()
+            for line, color in follower.read_new_lines():  # written right before game over
+                self.print_above_input(line.strip(), color)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stdin_fd = sys.stdin.fileno()
+        terminal_attributes = None
+        if termios is not None and os.isatty(stdin_fd):
+            terminal_attributes = termios.tcgetattr(stdin_fd)
+            tty.setcbreak(stdin_fd)  # characters are read as typed, and echoed by the client
+        loop.add_reader(stdin_fd, self.on_input_ready)
+        self.redraw_input_line()
+        try:
+            await self.follow_chat()
+        finally:
+            loop.remove_reader(stdin_fd)
+            if terminal_attributes is not None:
+                termios.tcsetattr(stdin_fd, termios.TCSADRAIN, terminal_attributes)
+            sys.stdout.write(CLEAR_LINE)
+            sys.stdout.flush()
 
 
 def main():
     game_dir = get_game_dir_from_argv()
-    print(colored(THREADING_WARNING_MESSAGE, WARNING_COLOR))
     name, is_mafia = welcome_player(game_dir)
-    game_read_and_write_loop(name, is_mafia, game_dir)
+    asyncio.run(TerminalClient(name, is_mafia, game_dir).run())
     game_over_message(game_dir)
     run_survey_about_llm_player(game_dir, name)
 
@@ -2,6 +2,9 @@
 usage: prepare_config.py [-h] [-o OUTPUT] [-p PLAYERS] [-m MAFIA] [-l {0,1}]
                          [-b] [-n NAMES_FILE] [-c] [-j LLM_CONFIG_JSON_PATH]
                          [-dt DAYTIME_MINUTES] [-nt NIGHTTIME_MINUTES]
+                         [-vt VOTING_MINUTES] [-se]
+                         [-jt JOIN_TIMEOUT_MINUTES] [-sm] [-cs CLOCK_SPEEDUP]
+                         [-cb]
 
 options:
   -h, --help            show this help message and exit
@@ -26,6 +29,27 @@ options:
                         number of minutes for Daytime phase
   -nt NIGHTTIME_MINUTES, --nighttime_minutes NIGHTTIME_MINUTES
                         number of minutes for Nighttime phase
+  -vt VOTING_MINUTES, --voting_minutes VOTING_MINUTES
+                        maximal number of minutes to wait for votes, after
+                        which missing votes are ignored and if nobody voted a
+                        random candidate is voted out ('none' waits for all
+                        votes, which is the default)
+  -se, --stop_voting_early
+                        whether voting ends as soon as the remaining votes
+                        can't change its outcome
+  -jt JOIN_TIMEOUT_MINUTES, --join_timeout_minutes JOIN_TIMEOUT_MINUTES
+                        maximal number of minutes to wait for all players to
+                        join, after which the game is cancelled (default is
+                        to wait forever)
+  -sm, --sequenced_messages
+                        whether chat messages are stamped with sequence
+                        numbers and milliseconds (message format version 2)
+  -cs CLOCK_SPEEDUP, --clock_speedup CLOCK_SPEEDUP
+                        how many times faster than real time the game runs,
+                        only allowed when all the players are LLMs
+  -cb, --chat_bus       whether public messages are also published in shared
+                        memory, for faster delivery to players on the same
+                        machine as the game manager
 
 Process finished with exit code 0
 
@@ -41,7 +65,10 @@ from dataclasses import dataclass, asdict, field
 from game_constants import DEFAULT_CONFIG_DIR, DEFAULT_NUM_PLAYERS, DEFAULT_NUM_MAFIA, \
     MINIMUM_NUM_PLAYERS_FOR_ONE_MAFIA, MINIMUM_NUM_PLAYERS_FOR_MULT_MAFIA, OPTIONAL_CODE_NAMES, \
     WARNING_LIMIT_NUM_MAFIA, PLAYERS_KEY_IN_CONFIG, DEFAULT_DAYTIME_MINUTES, \
-    DEFAULT_NIGHTTIME_MINUTES, DAYTIME_MINUTES_KEY, NIGHTTIME_MINUTES_KEY
+    DEFAULT_NIGHTTIME_MINUTES, DAYTIME_MINUTES_KEY, NIGHTTIME_MINUTES_KEY, DEFAULT_VOTING_MINUTES, \
+    VOTING_MINUTES_KEY, STOP_VOTING_EARLY_KEY, DEFAULT_JOIN_TIMEOUT_MINUTES, JOIN_TIMEOUT_MINUTES_KEY, \
+    DEFAULT_MESSAGE_FORMAT_VERSION, MESSAGE_FORMAT_VERSION_KEY, DEFAULT_CLOCK_SPEEDUP, \
+    CLOCK_SPEEDUP_KEY, USE_CHAT_BUS_KEY
 from llm_players.llm_constants import INT_CONFIG_KEYS, FLOAT_CONFIG_KEYS, DEFAULT_LLM_CONFIG, \
     LLM_CONFIG_KEYS_OPTIONS, BOOL_CONFIG_KEYS
 
@@ -60,6 +87,10 @@ class PlayerConfig:
     llm_config: dict = field(default_factory=dict)
 
 
+def optional_minutes(value):
+    return None if value.lower() == "none" else float(value)
+
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("-o", "--output", default=None, help="output config file name")
@@ -83,6 +114,27 @@ def parse_args():
                         help="number of minutes for Daytime phase")
     parser.add_argument("-nt", "--nighttime_minutes", type=float, default=DEFAULT_NIGHTTIME_MINUTES,
                         help="number of minutes for Nighttime phase")
+    parser.add_argument("-vt", "--voting_minutes", type=optional_minutes,
+                        default=DEFAULT_VOTING_MINUTES,
+                        help="maximal number of minutes to wait for votes, after which missing "
+                             "votes are ignored and if nobody voted a random candidate is voted "
+                             "out ('none' waits for all votes, which is the default)")
+    parser.add_argument("-se", "--stop_voting_early", action="store_true",
+                        help="whether voting ends as soon as the remaining votes "
+                             "can't change its outcome")
+    parser.add_argument("-jt", "--join_timeout_minutes", type=float,
+                        default=DEFAULT_JOIN_TIMEOUT_MINUTES,
+                        help="maximal number of minutes to wait for all players to join, after "
+                             "which the game is cancelled (default is to wait forever)")
+    parser.add_argument("-sm", "--sequenced_messages", action="store_true",
+                        help="whether chat messages are stamped with sequence numbers and "
+                             "milliseconds (message format version 2)")
+    parser.add_argument("-cs", "--clock_speedup", type=float, default=DEFAULT_CLOCK_SPEEDUP,
+                        help="how many times faster than real time the game runs, "
+                             "only allowed when all the players are LLMs")
+    parser.add_argument("-cb", "--chat_bus", action="store_true",
+                        help="whether public messages are also published in shared memory, for "
+                             "faster delivery to players on the same machine as the game manager")
     args = parser.parse_args()
     return args
 
@@ -139,6 +191,14 @@ def handle_num_players(args):
     return player_configs
 
 
+def validate_clock_speedup(args, player_configs):
+    human_players = [player_config.name for player_config in player_configs
+                     if not player_config.is_llm]
+    if args.clock_speedup != DEFAULT_CLOCK_SPEEDUP and human_players:
+        raise ValueError(f"Clock speedup (with -cs/--clock_speedup) is only allowed when all the "
+                         f"players are LLMs, but these are humans: {', '.join(human_players)}")
+
+
 def get_llm_config(llm_numbered_symbol, args):
     if args.llm_config_json_path is not None:
         print("Using the LLM configuration in provided path:", args.llm_config_json_path)
@@ -229,6 +289,13 @@ def save_config(args, output_file, player_configs):
     config = {PLAYERS_KEY_IN_CONFIG: [asdict(player_config) for player_config in player_configs],
               DAYTIME_MINUTES_KEY: args.daytime_minutes,
               NIGHTTIME_MINUTES_KEY: args.nighttime_minutes,
+              VOTING_MINUTES_KEY: args.voting_minutes,
+              STOP_VOTING_EARLY_KEY: args.stop_voting_early,
+              JOIN_TIMEOUT_MINUTES_KEY: args.join_timeout_minutes,
+              MESSAGE_FORMAT_VERSION_KEY: 2 if args.sequenced_messages
+              else DEFAULT_MESSAGE_FORMAT_VERSION,
+              CLOCK_SPEEDUP_KEY: args.clock_speedup,
+              USE_CHAT_BUS_KEY: args.chat_bus,
               "notes": input("Add notes to this config: [or enter to skip] ").strip(),
               "preparation_command": " ".join(sys.argv)}
     with open(output_file, "w") as f:
@@ -242,6 +309,7 @@ def main():
     validate_names_file(args)
     player_configs = handle_num_players(args)
     handle_llm_participation(args, player_configs)
+    validate_clock_speedup(args, player_configs)
     assign_real_names(args, player_configs)
     save_config(args, output_file, player_configs)
 
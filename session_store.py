@@ -0,0 +1,115 @@
+import os
+import json
+import sqlite3
+import threading
+from game_constants import WEB_SESSION_STORE_ENV_VAR, SQLITE_BUSY_TIMEOUT_SECONDS
+
+
+class MemorySessionStore:
+    """
+    Keeps the players' web sessions and their votes in the memory of the process, which is enough
+    when the web server runs in a single process (one uvicorn worker).
+    """
+
+    queries_may_block = False  # so they run directly on the web server's event loop
+
+    def __init__(self):
+        self._sessions = {}  # session ID -> session data
+        self._votes = {}  # (game ID, player name, round) -> voted player
+        self._lock = threading.Lock()
+
+    def get_session(self, session_id):
+        with self._lock:
+            return dict(self._sessions.get(session_id, {}))
+
+    def set_session(self, session_id, session_data):
+        with self._lock:
+            self._sessions[session_id] = dict(session_data)
+
+    def record_vote(self, game_id, character_name, current_round, voted_player):
+        """Records the player's vote in this round, returns False if they already voted in it"""
+        with self._lock:
+            key = (game_id, character_name, current_round)
+            if key in self._votes:
+                return False
+            self._votes[key] = voted_player
+            return True
+
+    def get_vote(self, game_id, character_name, current_round):
+        """The player's vote in this round, or None if they didn't vote yet"""
+        with self._lock:
+            return self._votes.get((game_id, character_name, current_round))
+
+    def delete_votes(self, game_id):
+        """Forgets the votes of a game that ended"""
+        with self._lock:
+            self._votes = {key: voted_player for key, voted_player in self._votes.items()
+                           if key[0] != game_id}
+
+
+class SQLiteSessionStore:
+    """
+    Keeps the players' web sessions and their votes in an SQLite database in WAL mode, shared by
+    all the processes (uvicorn workers) of the web server on this host, so a player's requests can
+    reach any of them. Recording a vote is atomic across the processes.
+    """
+
+    queries_may_block = True  # waiting for the other processes' writes, up to the busy timeout
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()  # a connection per thread
+        with self._get_connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS sessions "
+                               "(session_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS votes (game_id TEXT, character_name TEXT, "
+                               "round INTEGER, voted_player TEXT NOT NULL, "
+                               "PRIMARY KEY (game_id, character_name, round))")
+
+    def _get_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(
+                self.path, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+            connection.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+            connection.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, without fsync per commit
+        return connection
+
+    def get_session(self, session_id):
+        row = self._get_connection().execute(
+            "SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def set_session(self, session_id, session_data):
+        with self._get_connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?)",
+                               (session_id, json.dumps(session_data)))
+
+    def record_vote(self, game_id, character_name, current_round, voted_player):
+        """Records the player's vote in this round, returns False if they already voted in it"""
+        with self._get_connection() as connection:
+            cursor = connection.execute("INSERT OR IGNORE INTO votes VALUES (?, ?, ?, ?)",
+                                        (game_id, character_name, current_round, voted_player))
+            return cursor.rowcount == 1
+
+    def get_vote(self, game_id, character_name, current_round):
+        """The player's vote in this round, or None if they didn't vote yet"""
+        row = self._get_connection().execute(
+            "SELECT voted_player FROM votes WHERE game_id = ? AND character_name = ? AND round = ?",
+            (game_id, character_name, current_round)).fetchone()
+        return row[0] if row else None
+
+    def delete_votes(self, game_id):
+        """Forgets the votes of a game that ended"""
+        with self._get_connection() as connection:
+            connection.execute("DELETE FROM votes WHERE game_id = ?", (game_id,))
+
+
+def get_session_store():
+    """
+    The SQLite store if the environment variable WEB_SESSION_STORE_ENV_VAR has the path of its
+    database (which the web server sets for its workers when it runs more than one), otherwise the
+    in-memory store.
+    """
+    path = os.environ.get(WEB_SESSION_STORE_ENV_VAR)
+    return SQLiteSessionStore(path) if path else MemorySessionStore()
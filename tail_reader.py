@@ -0,0 +1,50 @@
+class TailReader:
+    """
+    Reads only what was appended to a text file since the previous read, by remembering the
+    byte offset it got to. A trailing line without a line break is still being written, so it's kept
+    aside until it is completed, and returned then as a whole.
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        self.offset = offset  # position in the file of the first byte not returned yet
+        self._partial_line = b""
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            try:
+                self._file = open(self.path, "rb")
+            except FileNotFoundError:
+                return None
+        return self._file
+
+    def read_new_lines(self):
+        """Returns the new complete lines, each one including its line break (like `readlines`)"""
+        f = self._open()
+        if f is None:
+            return []
+        f.seek(self.offset + len(self._partial_line))
+        data = self._partial_line + f.read()
+        last_line_end = data.rfind(b"\n") + 1
+        self._partial_line = data[last_line_end:]
+        if not last_line_end:
+            return []
+        self.offset += last_line_end
+        # not using `splitlines`, it also splits on characters other than "\n" (unlike `readlines`)
+        return [line.decode() + "\n" for line in data[:last_line_end - 1].split(b"\n")]
+
+    def skip_to_end(self):
+        """Ignores everything that was written so far, e.g. stale votes from previous rounds"""
+        self.read_new_lines()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the modules of the repo are top-level modules, imported from its root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,38 @@
+import json
+import asyncio
+from pathlib import Path
+from game_constants import DIRS_PREFIX, JOINED, PERSONAL_STATUS_FILE_FORMAT, PERSONAL_VOTE_FILE_FORMAT
+from prepare_game import init_game
+
+PLAYERS = [{"name": "Sage", "is_mafia": False, "is_llm": False, "real_name": "A"},
+           {"name": "Robin", "is_mafia": False, "is_llm": False, "real_name": "B"},
+           {"name": "Kai", "is_mafia": True, "is_llm": False, "real_name": "C"}]
+
+
+def prepare_joined_game(tmp_path, monkeypatch, **config):
+    monkeypatch.chdir(tmp_path)
+    Path(DIRS_PREFIX).mkdir()
+    config_path = tmp_path / "config.json"
+    # a short daytime and, unless configured otherwise, a voting that waits for all the votes
+    config_path.write_text(json.dumps({"players": PLAYERS, "daytime_minutes": 0.002,
+                                       "nighttime_minutes": 0.002, "notes": "", **config}))
+    init_game("0001", str(config_path))
+    game_dir = Path(DIRS_PREFIX) / "0001"
+    for player in PLAYERS:
+        (game_dir / PERSONAL_STATUS_FILE_FORMAT.format(player["name"])).write_text(JOINED)
+    return game_dir
+
+
+def vote(game_dir, voter, voted_for):
+    with open(game_dir / PERSONAL_VOTE_FILE_FORMAT.format(voter), "a") as f:
+        f.write(voted_for + "\n")
+
+
+async def run_until(game, condition):
+    task = asyncio.create_task(game.run())
+    while not condition():
+        assert not task.done()
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    game.journal.close()  # like a game manager that crashed
@@ -0,0 +1,60 @@
+import os
+import pytest
+import chat_bus
+from game_constants import PUBLIC_MANAGER_CHAT_FILE, PUBLIC_DAYTIME_CHAT_FILE, \
+    PUBLIC_NIGHTTIME_CHAT_FILE, format_message
+from chat_bus import ChatBusWriter, ChatBusReader
+from player_chat import PublicChatFollower
+
+
+@pytest.fixture
+def game_dir(tmp_path):
+    # the bus is named after the game dir, so it mustn't be the bus of another game on this machine
+    game_dir = tmp_path / f"test-chat-bus-{os.getpid()}"
+    game_dir.mkdir()
+    return game_dir
+
+
+def write_line(game_dir, writer, stream, line):
+    writer.publish(stream, line)
+    with open(game_dir / stream, "a") as f:
+        f.write(line)
+
+
+def test_follower_reads_the_bus(game_dir):
+    lines = [(PUBLIC_MANAGER_CHAT_FILE, format_message("Manager", "Daytime", 0)),
+             (PUBLIC_DAYTIME_CHAT_FILE, format_message("Sage", "hi", 1)),
+             (PUBLIC_NIGHTTIME_CHAT_FILE, format_message("Kai", "psst", 2)),
+             (PUBLIC_DAYTIME_CHAT_FILE, format_message("Robin", "hey", 3))]
+    writer = ChatBusWriter(game_dir)
+    try:
+        write_line(game_dir, writer, *lines[0])
+        follower = PublicChatFollower(game_dir, is_mafia=False)
+        assert follower.chat_bus_reader is not None
+        for stream, line in lines[1:]:
+            write_line(game_dir, writer, stream, line)
+        # in the order they were written, without the nighttime chat that bystanders can't see
+        assert [line for line, _ in follower.read_new_lines()] == \
+               [line for stream, line in lines if stream != PUBLIC_NIGHTTIME_CHAT_FILE]
+        follower.close()
+    finally:
+        writer.close()
+
+
+def test_follower_reads_the_files_when_the_bus_cant_be_opened(game_dir, monkeypatch):
+    writer = ChatBusWriter(game_dir)
+    try:
+        line = format_message("Sage", "hi", 0)
+        write_line(game_dir, writer, PUBLIC_DAYTIME_CHAT_FILE, line)
+
+        def attach_without_permission(name):
+            raise PermissionError(f"no permission to open {name}")  # as if created by another user
+
+        monkeypatch.setattr(chat_bus, "_attach_shared_memory", attach_without_permission)
+        assert ChatBusReader.attach(game_dir) is None
+        follower = PublicChatFollower(game_dir, is_mafia=False)
+        assert follower.chat_bus_reader is None
+        assert [line for line, _ in follower.read_new_lines()] == [line]
+        follower.close()
+    finally:
+        writer.close()
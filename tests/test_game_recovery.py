@@ -0,0 +1,48 @@
+import json
+import asyncio
+import pytest
+from game_constants import PUBLIC_DAYTIME_CHAT_FILE, GAME_STATUS_FILE, DAYTIME_VOTING_TIME, \
+    VOTING_MESSAGE_FORMAT, BYSTANDERS_WIN_MESSAGE, STATUS_ROUND_KEY, \
+    STATUS_ELIMINATED_PLAYERS_KEY, STATUS_WHO_WINS_KEY
+from mafia_main import Game, GameAlreadyRunningError
+from game_utils import prepare_joined_game, vote, run_until
+
+
+def test_resume_during_vote(tmp_path, monkeypatch):
+    game_dir = prepare_joined_game(tmp_path, monkeypatch)
+
+    async def crash_and_resume():
+        game = Game(game_dir)
+        await run_until(game, lambda: game.state.phase == DAYTIME_VOTING_TIME)
+        vote(game_dir, "Sage", "Kai")  # collected before the crash
+        game = Game(game_dir)
+        await run_until(game, lambda: game.state.votes)
+        vote(game_dir, "Robin", "Kai")  # while the game manager is down
+        game = Game(game_dir)
+        task = asyncio.create_task(game.run())
+        while len(game.state.votes) < 2:
+            await asyncio.sleep(0.01)
+        vote(game_dir, "Kai", "Sage")
+        await asyncio.wait_for(task, timeout=10)
+
+    asyncio.run(crash_and_resume())
+    snapshot = json.loads((game_dir / GAME_STATUS_FILE).read_text())
+    assert snapshot[STATUS_ROUND_KEY] == 1
+    assert snapshot[STATUS_ELIMINATED_PLAYERS_KEY] == ["Kai"]
+    assert snapshot[STATUS_WHO_WINS_KEY] == BYSTANDERS_WIN_MESSAGE
+    daytime_chat = (game_dir / PUBLIC_DAYTIME_CHAT_FILE).read_text()
+    for voter, voted_for in [("Sage", "Kai"), ("Robin", "Kai"), ("Kai", "Sage")]:
+        assert daytime_chat.count(VOTING_MESSAGE_FORMAT.format(voter, voted_for)) == 1
+
+
+def test_game_runs_in_one_game_manager(tmp_path, monkeypatch):
+    game_dir = prepare_joined_game(tmp_path, monkeypatch)
+
+    async def run_twice():
+        game = Game(game_dir)
+        with pytest.raises(GameAlreadyRunningError):
+            Game(game_dir)
+        await run_until(game, lambda: game.state.phase == DAYTIME_VOTING_TIME)
+        Game(game_dir).lock_file.close()  # the lock is released once the game stops running
+
+    asyncio.run(run_twice())
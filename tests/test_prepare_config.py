@@ -0,0 +1,15 @@
+import pytest
+from argparse import Namespace
+from game_constants import DEFAULT_CLOCK_SPEEDUP
+from prepare_config import PlayerConfig, validate_clock_speedup
+
+
+def test_clock_speedup_only_with_llm_players():
+    llm_players = [PlayerConfig("Sage", is_llm=True), PlayerConfig("Kai", is_mafia=True, is_llm=True)]
+    with_human = llm_players + [PlayerConfig("Robin")]
+    validate_clock_speedup(Namespace(clock_speedup=10), llm_players)
+    validate_clock_speedup(Namespace(clock_speedup=DEFAULT_CLOCK_SPEEDUP), with_human)
+    with pytest.raises(ValueError, match="Robin"):
+        validate_clock_speedup(Namespace(clock_speedup=10), with_human)
+    with pytest.raises(ValueError):
+        validate_clock_speedup(Namespace(clock_speedup=0.5), with_human)  # slowdown too
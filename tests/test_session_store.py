@@ -0,0 +1,17 @@
+import pytest
+from session_store import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    return MemorySessionStore() if request.param == "memory" \
+        else SQLiteSessionStore(str(tmp_path / "web_sessions.sqlite3"))
+
+
+def test_delete_votes_of_ended_game(store):
+    assert store.record_vote("0001", "Sage", 1, "Kai")
+    assert not store.record_vote("0001", "Sage", 1, "Robin")  # already voted in this round
+    assert store.record_vote("0002", "Sage", 1, "Robin")
+    store.delete_votes("0001")
+    assert store.get_vote("0001", "Sage", 1) is None
+    assert store.get_vote("0002", "Sage", 1) == "Robin"  # of a game that didn't end
@@ -0,0 +1,34 @@
+import asyncio
+import pytest
+from game_constants import PUBLIC_DAYTIME_CHAT_FILE, DAYTIME_VOTING_TIME, NO_VOTES_MESSAGE_FORMAT, \
+    NO_VALID_VOTES_MESSAGE_FORMAT, get_message_content
+from mafia_main import Game
+from game_utils import PLAYERS, prepare_joined_game, vote
+
+
+def get_random_choice_messages(game_dir):
+    chat = (game_dir / PUBLIC_DAYTIME_CHAT_FILE).read_text().splitlines()
+    return [content for content in map(get_message_content, chat)
+            if content.endswith(NO_VOTES_MESSAGE_FORMAT.split("{}")[1])]
+
+
+@pytest.mark.parametrize("votes, message_format", [
+    ([], NO_VOTES_MESSAGE_FORMAT),  # voting closes at its deadline
+    ([(player["name"], "Nobody") for player in PLAYERS], NO_VALID_VOTES_MESSAGE_FORMAT)])
+def test_voted_out_randomly(tmp_path, monkeypatch, votes, message_format):
+    game_dir = prepare_joined_game(tmp_path, monkeypatch, voting_minutes=1 / 60)
+
+    async def run_game():
+        game = Game(game_dir)
+        task = asyncio.create_task(game.run())
+        while game.state.phase != DAYTIME_VOTING_TIME:
+            await asyncio.sleep(0.01)
+        for voter, voted_for in votes:
+            vote(game_dir, voter, voted_for)
+        await asyncio.wait_for(task, timeout=10)
+
+    asyncio.run(run_game())
+    [message] = get_random_choice_messages(game_dir)
+    prefix, suffix = message_format.split("{}")
+    assert message.startswith(prefix) and message.removeprefix(prefix).removesuffix(suffix) in \
+           [player["name"] for player in PLAYERS]